@@ -0,0 +1,177 @@
+"""Fingerprinted, precompressed static assets.
+
+Static files (except the participant photos) are fingerprinted with a
+content hash, e.g. ``css/style.css`` -> ``css/style.3f9a1c2b.css``, and
+text assets are precompressed with gzip (and brotli when installed).
+Fingerprinted URLs never change content, so they are served with
+``Cache-Control: immutable``.
+
+Build ahead of time with:
+
+    python -m app.assets
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Get the base directory
+BASE_DIR = Path(__file__).resolve().parent
+STATIC_DIR = BASE_DIR / "static"
+COMPRESSED_DIR = BASE_DIR / "build" / "compressed"
+
+# Photos are large and handled by the image pipeline instead
+SKIP_DIRS = {"images", "derived"}
+TEXT_EXTENSIONS = {".css", ".js", ".html", ".json", ".svg", ".txt", ".map"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Encodings in order of preference, with their file suffixes
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+
+def _content_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class AssetManifest:
+    """Maps static paths to fingerprinted paths and precompressed copies."""
+
+    def __init__(self, static_dir: Path = STATIC_DIR, compressed_dir: Path = COMPRESSED_DIR):
+        self.static_dir = Path(static_dir)
+        self.compressed_dir = Path(compressed_dir)
+        self._lock = threading.Lock()
+        self._fingerprinted: Dict[str, str] = {}
+        self._originals: Dict[str, str] = {}
+        self._hashes: Dict[str, str] = {}
+
+    def build(self) -> int:
+        """Fingerprint static files and write any missing compressed copies."""
+        fingerprinted, originals, hashes = {}, {}, {}
+        for path in sorted(self.static_dir.rglob("*")):
+            relative = path.relative_to(self.static_dir)
+            if not path.is_file() or relative.parts[0] in SKIP_DIRS or path.name.startswith("."):
+                continue
+            content_hash = _content_hash(path)
+            name = relative.as_posix()
+            hashed = relative.with_name(f"{path.stem}.{content_hash}{path.suffix}").as_posix()
+            fingerprinted[name] = hashed
+            originals[hashed] = name
+            hashes[name] = content_hash
+            if path.suffix in TEXT_EXTENSIONS:
+                self._compress(path, content_hash)
+
+        with self._lock:
+            self._fingerprinted, self._originals, self._hashes = fingerprinted, originals, hashes
+        return len(fingerprinted)
+
+    def _compress(self, path: Path, content_hash: str):
+        data = None
+        for encoding, suffix in ENCODINGS:
+            if encoding == "br" and brotli is None:
+                continue
+            target = self.compressed_dir / f"{content_hash}{path.suffix}{suffix}"
+            if target.exists():
+                continue
+            if data is None:
+                data = path.read_bytes()
+            compressed = brotli.compress(data) if encoding == "br" else gzip.compress(data, 9, mtime=0)
+            self.compressed_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = target.with_name(target.name + ".tmp")
+            tmp_path.write_bytes(compressed)
+            os.replace(tmp_path, target)
+
+    def url_path(self, path: str) -> str:
+        """Return the fingerprinted form of a static path, if there is one."""
+        hashed = self._fingerprinted.get(path.lstrip("/"))
+        if hashed is None:
+            return path
+        return ("/" if path.startswith("/") else "") + hashed
+
+    def original(self, hashed: str) -> Optional[str]:
+        """Return the real static path behind a fingerprinted one."""
+        return self._originals.get(hashed)
+
+    def compressed(self, name: str, accept_encoding: str):
+        """Return (encoding, path) of the best precompressed copy the client accepts."""
+        content_hash = self._hashes.get(name)
+        if content_hash is None:
+            return None
+        accepted = {part.split(";")[0].strip() for part in accept_encoding.split(",")}
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            candidate = self.compressed_dir / f"{content_hash}{Path(name).suffix}{suffix}"
+            if candidate.exists():
+                return encoding, candidate
+        return None
+
+    @property
+    def version(self) -> str:
+        """Digest of all fingerprints, for keys that depend on asset URLs."""
+        return hashlib.sha256("".join(sorted(self._fingerprinted.values())).encode()).hexdigest()[:12]
+
+
+class FingerprintedStaticFiles(StaticFiles):
+    """StaticFiles that serves fingerprinted URLs as immutable and precompressed."""
+
+    def __init__(self, *, manifest: AssetManifest, **kwargs):
+        super().__init__(**kwargs)
+        self.manifest = manifest
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        name = Path(path).as_posix()
+        original = self.manifest.original(name)
+        if original is None:
+            response = await super().get_response(path, scope)
+            # Photo derivatives are already named by content hash
+            if name.startswith("derived/") and not name.endswith(".json") and response.status_code == 200:
+                response.headers["Cache-Control"] = IMMUTABLE
+            return response
+
+        if scope["method"] in ("GET", "HEAD"):
+            accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+            precompressed = self.manifest.compressed(original, accept_encoding)
+            if precompressed:
+                encoding, compressed_path = precompressed
+                media_type = mimetypes.guess_type(original)[0] or "application/octet-stream"
+                return FileResponse(compressed_path, media_type=media_type, headers={
+                    "Content-Encoding": encoding,
+                    "Vary": "Accept-Encoding",
+                    "Cache-Control": IMMUTABLE,
+                })
+
+        response = await super().get_response(original, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE
+            if Path(original).suffix in TEXT_EXTENSIONS:
+                response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+manifest = AssetManifest()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    count = manifest.build()
+    logger.info(f"Fingerprinted {count} static assets; compressed copies in {COMPRESSED_DIR}")
@@ -0,0 +1,222 @@
+"""Online backups of the lottery database.
+
+Backups use SQLite's online backup API, copying a limited number of pages
+per step and pausing in between, so draws keep running while a backup is
+taken. Each backup is written to a temporary file, checked and then
+renamed into BACKUP_DIR as ``lottery-<UTC timestamp>-<reason>.db``. The
+newest BACKUP_RETENTION backups are kept per reason (scheduled, manual,
+pre-reset, pre-restore).
+
+Take a backup by hand with:
+
+    python -m app.backup
+"""
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+from . import database
+from .metrics import registry as metrics
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIR = Path(os.environ.get("BACKUP_DIR", database.BASE_DIR / "backups"))
+# Seconds between scheduled backups (0 disables them); unchanged state is skipped
+BACKUP_INTERVAL = float(os.environ.get("BACKUP_INTERVAL", 3600))
+# Backups kept per reason
+BACKUP_RETENTION = int(os.environ.get("BACKUP_RETENTION", 24))
+# Pages copied per step, and the pause between steps that lets writers in
+BACKUP_PAGES_PER_STEP = int(os.environ.get("BACKUP_PAGES_PER_STEP", 256))
+BACKUP_STEP_PAUSE = float(os.environ.get("BACKUP_STEP_PAUSE", 0.005))
+# A stepped backup restarts whenever another connection writes mid-copy. After
+# this many restarts the rest is copied in one step, which in WAL mode holds
+# only a read snapshot and so still doesn't block writers.
+MAX_RESTARTS = 20
+
+BACKUP_NAME_PATTERN = re.compile(r"^lottery-(\d{8}-\d{6}-\d{6})-([a-z]+(?:-[a-z]+)*)\.db$")
+
+BACKUP_DURATION = metrics.histogram(
+    "lottery_backup_duration_seconds", "Time to take a database backup", ["reason"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+BACKUP_PAGES = metrics.counter(
+    "lottery_backup_pages_total", "Database pages copied by backups, including restarted copies")
+BACKUP_FAILURES = metrics.counter(
+    "lottery_backup_failures_total", "Backups that failed")
+LAST_BACKUP = metrics.gauge(
+    "lottery_backup_last_success_timestamp_seconds", "Unix time of the last successful backup")
+
+
+class BackupError(Exception):
+    """Raised when a backup cannot be taken or restored."""
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    return sqlite3.connect(path, timeout=database.BUSY_TIMEOUT_MS / 1000)
+
+
+def create_backup(reason: str = "manual") -> Dict[str, Any]:
+    """Copy the live database into a new backup file and apply retention.
+
+    Returns the backup's name, size, page count, number of steps and
+    restarts, and duration.
+    """
+    if not re.fullmatch(r"[a-z]+(?:-[a-z]+)*", reason):
+        raise BackupError(f"Invalid backup reason: {reason!r}")
+    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+    name = f"lottery-{datetime.utcnow().strftime('%Y%m%d-%H%M%S-%f')}-{reason}.db"
+    target = BACKUP_DIR / name
+    tmp_path = target.with_name(target.name + ".tmp")
+    progress = {"steps": 0, "pages": 0, "restarts": 0, "remaining": None, "singleStep": False}
+
+    def on_progress(status, remaining, total):
+        previous = progress["remaining"]
+        # `remaining` grows again when a write elsewhere restarted the copy
+        if previous is not None and remaining > previous:
+            progress["restarts"] += 1
+            if progress["restarts"] > MAX_RESTARTS and not progress["singleStep"]:
+                raise _TooManyRestarts()
+            previous = None
+        progress["pages"] += (total if previous is None else previous) - remaining
+        progress["steps"] += 1
+        progress["remaining"] = remaining
+        progress["total"] = total
+        if remaining and BACKUP_STEP_PAUSE > 0:
+            time.sleep(BACKUP_STEP_PAUSE)
+
+    started = time.perf_counter()
+    source = _connect(database.DB_PATH)
+    try:
+        destination = sqlite3.connect(tmp_path)
+        try:
+            try:
+                source.backup(destination, pages=BACKUP_PAGES_PER_STEP, progress=on_progress)
+            except _TooManyRestarts:
+                logger.warning(f"Backup restarted {MAX_RESTARTS} times; copying the rest in one step")
+                progress["singleStep"] = True
+                progress["remaining"] = None
+                source.backup(destination, progress=on_progress)
+            # Keep backups self-contained single files
+            destination.execute("PRAGMA journal_mode=DELETE")
+            check = destination.execute("PRAGMA quick_check").fetchone()[0]
+            if check != "ok":
+                raise BackupError(f"Backup failed integrity check: {check}")
+        finally:
+            destination.close()
+        os.replace(tmp_path, target)
+    except (sqlite3.Error, BackupError, OSError) as e:
+        BACKUP_FAILURES.inc()
+        tmp_path.unlink(missing_ok=True)
+        if isinstance(e, BackupError):
+            raise
+        raise BackupError(f"Backup failed: {str(e)}")
+    finally:
+        source.close()
+
+    duration = time.perf_counter() - started
+    BACKUP_DURATION.observe(duration, reason=reason)
+    BACKUP_PAGES.inc(progress["pages"])
+    LAST_BACKUP.set(time.time())
+    pruned = prune_backups(reason)
+    result = {
+        "name": name,
+        "reason": reason,
+        "bytes": target.stat().st_size,
+        "pages": progress.get("total", 0),
+        "pagesCopied": progress["pages"],
+        "steps": progress["steps"],
+        "restarts": progress["restarts"],
+        "singleStep": progress["singleStep"],
+        "durationMs": round(duration * 1000, 1),
+        "pruned": pruned,
+    }
+    logger.info(f"Backup {name}: {result['pages']} pages in {result['steps']} steps, "
+                f"{result['durationMs']} ms, {result['restarts']} restarts")
+    return result
+
+
+def list_backups() -> List[Dict[str, Any]]:
+    """Backups in BACKUP_DIR, newest first."""
+    if not BACKUP_DIR.exists():
+        return []
+    backups = []
+    for path in BACKUP_DIR.iterdir():
+        match = BACKUP_NAME_PATTERN.match(path.name)
+        if not match:
+            continue
+        created = datetime.strptime(match.group(1), "%Y%m%d-%H%M%S-%f")
+        backups.append({
+            "name": path.name,
+            "reason": match.group(2),
+            "createdAt": created.isoformat() + "Z",
+            "bytes": path.stat().st_size,
+        })
+    backups.sort(key=lambda backup: backup["name"][len("lottery-"):], reverse=True)
+    return backups
+
+
+def prune_backups(reason: str, keep: int = BACKUP_RETENTION) -> List[str]:
+    """Delete all but the newest `keep` backups taken for `reason`."""
+    stale = [backup["name"] for backup in list_backups() if backup["reason"] == reason][keep:]
+    for name in stale:
+        (BACKUP_DIR / name).unlink(missing_ok=True)
+    return stale
+
+
+def restore_backup(name: str) -> Dict[str, Any]:
+    """Replace the live database's contents with a backup.
+
+    The current database is backed up first ("pre-restore"). The backup
+    is copied and brought up to the current schema, then its tables
+    replace the live ones in a single write transaction, so no write can
+    land in between and other connections see either the old or the
+    restored state. The draw journal is kept and the restore appended to
+    it. Returns the restored and safety backups' details.
+    """
+    if not BACKUP_NAME_PATTERN.match(name) or not (BACKUP_DIR / name).is_file():
+        raise BackupError(f"No such backup: {name}")
+    safety = create_backup("pre-restore")
+
+    started = time.perf_counter()
+    staging = BACKUP_DIR / f"{name}.restore.tmp"
+    try:
+        shutil.copyfile(BACKUP_DIR / name, staging)
+        # Older backups may predate schema migrations
+        connection = _connect(staging)
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            database.migrate(connection.cursor())
+            connection.commit()
+        finally:
+            connection.close()
+        version, _ = database.restore_tables(staging, name)
+    # The database module reports its errors as plain exceptions
+    except Exception as e:
+        raise BackupError(f"Restore failed: {str(e)}")
+    finally:
+        staging.unlink(missing_ok=True)
+
+    # Snapshot the restored state so replays start after the restore
+    database.compact_journal(force=True)
+    duration = time.perf_counter() - started
+    logger.warning(f"Restored database from {name} in {duration * 1000:.1f} ms (state version {version})")
+    return {
+        "restored": name,
+        "safetyBackup": safety["name"],
+        "version": version,
+        "durationMs": round(duration * 1000, 1),
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    create_backup("manual")
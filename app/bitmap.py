@@ -0,0 +1,153 @@
+"""Compact participant id sets.
+
+Participant ids are mapped to dense positions 0..n-1 in ascending id order
+(DenseIndex), and sets of participants such as an event's winners or
+absentees are held as bitmaps over those positions (ParticipantSet): one
+bit per roster entry instead of a Python int object per member.
+
+Bit i of a bitmap is bit ``i % 8`` (least significant first) of byte
+``i // 8``, and stands for the i-th roster id in ascending order. That is
+the layout of the base64 encoding served by /winners?encoding=bitmap.
+"""
+import base64
+from array import array
+from bisect import bisect_left
+from collections.abc import Set
+from typing import Iterable, Iterator, List, Optional
+
+
+class DenseIndex:
+    """Maps roster ids to dense bit positions, ordered by id.
+
+    Ids are kept in a sorted array; a roster of consecutive ids is looked
+    up by offset, anything else by binary search.
+    """
+
+    def __init__(self, ids: Iterable[int], roster_version: Optional[int] = None):
+        self.ids = array("q", sorted(set(int(participant_id) for participant_id in ids)))
+        self.roster_version = roster_version
+        self._contiguous = not self.ids or self.ids[-1] - self.ids[0] + 1 == len(self.ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def position(self, participant_id: int) -> Optional[int]:
+        """Bit position of an id, or None if it is not in the roster."""
+        if not self.ids:
+            return None
+        if self._contiguous:
+            position = participant_id - self.ids[0]
+            return position if 0 <= position < len(self.ids) else None
+        position = bisect_left(self.ids, participant_id)
+        if position < len(self.ids) and self.ids[position] == participant_id:
+            return position
+        return None
+
+    def set_of(self, participant_ids: Iterable[int]) -> "ParticipantSet":
+        """Build a ParticipantSet over this index."""
+        bits = bytearray((len(self.ids) + 7) // 8)
+        extra = set()
+        for participant_id in participant_ids:
+            position = self.position(participant_id)
+            if position is None:
+                extra.add(participant_id)
+            else:
+                bits[position >> 3] |= 1 << (position & 7)
+        return ParticipantSet(self, bytes(bits), frozenset(extra))
+
+    def everyone(self) -> "ParticipantSet":
+        """The set of every roster id."""
+        size = len(self.ids)
+        return ParticipantSet(self, ((1 << size) - 1).to_bytes((size + 7) // 8, "little"), frozenset())
+
+
+class ParticipantSet(Set):
+    """Immutable set of participant ids stored as a bitmap over a DenseIndex.
+
+    Ids outside the index (e.g. winners whose roster entry was since
+    removed) are kept in a small `extra` frozenset. Set operations between
+    sets on the same index are bitwise; anything else falls back to the
+    generic Set implementation.
+    """
+
+    __slots__ = ("index", "bits", "extra", "_len")
+
+    def __init__(self, index: DenseIndex, bits: bytes, extra: frozenset = frozenset()):
+        self.index = index
+        self.bits = bits
+        self.extra = extra
+        self._len = None
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        return frozenset(iterable)
+
+    def _as_int(self) -> int:
+        return int.from_bytes(self.bits, "little")
+
+    def _with_int(self, value: int, extra: frozenset) -> "ParticipantSet":
+        return ParticipantSet(self.index, value.to_bytes(len(self.bits), "little"), extra)
+
+    def __contains__(self, participant_id) -> bool:
+        position = self.index.position(participant_id)
+        if position is None:
+            return participant_id in self.extra
+        return bool(self.bits[position >> 3] >> (position & 7) & 1)
+
+    def __iter__(self) -> Iterator[int]:
+        ids = self.index.ids
+        for byte_index, byte in enumerate(self.bits):
+            while byte:
+                low = byte & -byte
+                yield ids[(byte_index << 3) + low.bit_length() - 1]
+                byte ^= low
+        yield from sorted(self.extra)
+
+    def __len__(self) -> int:
+        if self._len is None:
+            self._len = self._as_int().bit_count() + len(self.extra)
+        return self._len
+
+    def __repr__(self) -> str:
+        return f"ParticipantSet({sorted(self)!r})"
+
+    def _same_index(self, other) -> bool:
+        return isinstance(other, ParticipantSet) and other.index is self.index
+
+    def __or__(self, other):
+        if self._same_index(other):
+            return self._with_int(self._as_int() | other._as_int(), self.extra | other.extra)
+        return Set.__or__(self, other)
+
+    __ror__ = __or__
+
+    def __and__(self, other):
+        if self._same_index(other):
+            return self._with_int(self._as_int() & other._as_int(), self.extra & other.extra)
+        return Set.__and__(self, other)
+
+    def __sub__(self, other):
+        if self._same_index(other):
+            return self._with_int(self._as_int() & ~other._as_int(), self.extra - other.extra)
+        return Set.__sub__(self, other)
+
+    def __eq__(self, other):
+        if self._same_index(other):
+            return self.bits == other.bits and self.extra == other.extra
+        return Set.__eq__(self, other)
+
+    __hash__ = None
+
+    def to_base64(self) -> str:
+        """The bitmap, base64-encoded, without trailing zero bytes."""
+        return base64.b64encode(self.bits.rstrip(b"\0")).decode("ascii")
+
+    def ranges(self) -> List[List[int]]:
+        """Runs of consecutive ids as [first, last] pairs, in ascending order."""
+        runs: List[List[int]] = []
+        for participant_id in sorted(self) if self.extra else self:
+            if runs and runs[-1][1] == participant_id - 1:
+                runs[-1][1] = participant_id
+            else:
+                runs.append([participant_id, participant_id])
+        return runs
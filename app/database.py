@@ -1,207 +1,1442 @@
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+import asyncio
+import functools
+import json
 import os
+import queue
+import threading
+import time
 from pathlib import Path
+from typing import Optional
+
+from . import journal
+from .bitmap import DenseIndex
+from .metrics import registry as metrics
 
 # Get absolute path for database
 BASE_DIR = Path(__file__).resolve().parent
-DB_PATH = BASE_DIR / "lottery.db"
+DB_PATH = Path(os.environ.get("LOTTERY_DB_PATH", BASE_DIR / "lottery.db"))
+
+# Connection pool settings
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 8))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", 5000))
+
+# Threads that run blocking database calls for async handlers
+EXECUTOR_WORKERS = int(os.environ.get("DB_EXECUTOR_WORKERS", 4))
+
+# Event used when a request does not name one; databases created before
+# multi-event support hold their draw state under this id
+DEFAULT_EVENT = "default"
+
+# Journal events after the last snapshot before compaction writes a new one
+JOURNAL_COMPACT_EVENTS = int(os.environ.get("JOURNAL_COMPACT_EVENTS", 100))
+# Snapshots kept after compaction
+JOURNAL_SNAPSHOTS_KEPT = int(os.environ.get("JOURNAL_SNAPSHOTS_KEPT", 3))
+
+# Seconds a write's result is replayed to retries with the same idempotency key
+IDEMPOTENCY_TTL = float(os.environ.get("IDEMPOTENCY_TTL", 600))
+
+
+QUERY_DURATION = metrics.histogram(
+    "lottery_db_query_duration_seconds", "SQLite statement execution time by statement type", ["statement"])
+CONNECTIONS_OPENED = metrics.counter(
+    "lottery_db_connections_opened_total", "SQLite connections opened")
+POOL_CONNECTIONS = metrics.gauge(
+    "lottery_db_pool_connections", "Pooled SQLite connections by state", ["state"])
+POOL_WAITS = metrics.counter(
+    "lottery_db_pool_waits_total", "Checkouts that had to wait for a free connection")
+
+
+def _observe_query(sql: str, started: float):
+    words = sql.split(None, 1)
+    QUERY_DURATION.observe(time.perf_counter() - started, statement=words[0].upper() if words else "")
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that records statement counts and durations."""
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _observe_query(sql, started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _observe_query(sql, started)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors and commits are timed."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            _observe_query("COMMIT", started)
+
+
+class ConnectionPool:
+    """Bounded pool of reusable SQLite connections.
+
+    Connections are opened lazily in WAL mode and handed back to the pool
+    after use instead of being closed. A thread that already holds a
+    connection gets the same one back, so nested calls share it.
+    """
+
+    def __init__(self, max_size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = []
+        self._stats = {"checkouts": 0, "waits": 0, "opened": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(Path(DB_PATH).parent, exist_ok=True)
+        db = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                             factory=InstrumentedConnection)
+        CONNECTIONS_OPENED.inc()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return db
+
+    def _checkout(self) -> sqlite3.Connection:
+        with self._lock:
+            self._stats["checkouts"] += 1
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            if len(self._connections) < self.max_size:
+                db = self._connect()
+                self._connections.append(db)
+                self._stats["opened"] += 1
+                return db
+            self._stats["waits"] += 1
+            POOL_WAITS.inc()
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise Exception(f"Database error: timed out waiting for a connection after {self.timeout}s")
+
+    def _checkin(self, db: sqlite3.Connection):
+        if db.in_transaction:
+            db.rollback()
+        self._idle.put(db)
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection, reusing the one this thread already holds."""
+        held = getattr(self._local, "db", None)
+        if held is not None:
+            yield held
+            return
+        db = self._checkout()
+        self._local.db = db
+        try:
+            yield db
+        finally:
+            self._local.db = None
+            self._checkin(db)
+
+    def stats(self) -> dict:
+        """Return pool counters."""
+        with self._lock:
+            return {
+                **self._stats,
+                "open": len(self._connections),
+                "idle": self._idle.qsize(),
+                "max_size": self.max_size,
+            }
+
+    def close(self):
+        """Close every pooled connection."""
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait()
+                except queue.Empty:
+                    break
+            for db in self._connections:
+                db.close()
+            self._connections = []
+
+
+_pool = ConnectionPool()
 
 @contextmanager
 def get_db():
-    """Context manager for database connections."""
-    os.makedirs(BASE_DIR, exist_ok=True)
-    db = sqlite3.connect(DB_PATH)
-    try:
+    """Context manager for pooled connections; nested uses on one thread share a connection."""
+    with _pool.connection() as db:
         yield db
-    finally:
-        db.close()
 
-def init_db():
-    """Initialize the database with required tables."""
+def get_pool_stats():
+    """Get connection pool statistics."""
+    return _pool.stats()
+
+def update_pool_metrics():
+    """Copy current pool counters into the pool gauges."""
+    stats = _pool.stats()
+    POOL_CONNECTIONS.set(stats["open"], state="open")
+    POOL_CONNECTIONS.set(stats["idle"], state="idle")
+
+def close_pool():
+    """Close all pooled connections (e.g. on shutdown or after moving DB_PATH)."""
+    _pool.close()
+    _cache.reset()
+
+class StateCache:
+    """Versioned in-memory snapshot of read-mostly draw state.
+
+    The authoritative version lives in the state_version table and is
+    bumped inside every write transaction, so all worker processes agree on
+    it. Before serving from memory, sync() checks the connection's
+    PRAGMA data_version; if another connection or process has committed,
+    the stored version is re-read and the cache dropped if it moved. The
+    version is what HTTP handlers use as an ETag.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._data_versions = {}
+        self.version = 0
+        self.roster_version = 0
+        self.external_changes = 0
+        self.external_roster_changes = 0
+
+    def sync(self, db: sqlite3.Connection):
+        """Pick up writes committed through other connections or processes."""
+        data_version = db.execute("PRAGMA data_version").fetchone()[0]
+        if self._data_versions.get(id(db)) == data_version:
+            return
+        row = db.execute("SELECT version, roster_version FROM state_version WHERE id = 1").fetchone()
+        version, roster_version = row if row else (0, 0)
+        with self._lock:
+            self._data_versions[id(db)] = data_version
+            if roster_version > self.roster_version:
+                self.roster_version = roster_version
+                # Cached id sets are bitmaps over the old roster
+                self._values.clear()
+                self.external_roster_changes += 1
+            if version != self.version:
+                self.version = version
+                self._values.clear()
+                self.external_changes += 1
+
+    def get(self, key, loader):
+        """Return (version, value), loading the value on a cache miss."""
+        with self._lock:
+            version = self.version
+            if key in self._values:
+                return version, self._values[key]
+        value = loader()
+        with self._lock:
+            # Don't cache a value that raced with a write
+            if self.version == version:
+                self._values[key] = value
+        return version, value
+
+    def invalidate(self, version: int, roster_version: int = 0):
+        """Drop cached values after a local write committed `version`."""
+        with self._lock:
+            # Versions only grow; don't let a late invalidate move us back
+            self.version = max(self.version, version)
+            self.roster_version = max(self.roster_version, roster_version)
+            self._values.clear()
+
+    def prime(self, version: int, values: dict) -> bool:
+        """Fill in values known to be current as of `version`."""
+        with self._lock:
+            if version != self.version:
+                return False
+            for key, value in values.items():
+                self._values.setdefault(key, value)
+            return True
+
+    def reset(self):
+        """Forget everything, e.g. after the connection pool is closed."""
+        with self._lock:
+            self._values.clear()
+            self._data_versions.clear()
+            self.version = 0
+            self.roster_version = 0
+
+
+_cache = StateCache()
+
+def invalidate_cache(version: int, roster_version: int = 0):
+    """Drop cached state after the database changed outside the write helpers (e.g. a restore)."""
+    _cache.invalidate(version, roster_version)
+
+def _cached(key, loader):
     with get_db() as db:
-        cursor = db.cursor()
+        _cache.sync(db)
+        return _cache.get(key, loader)
+
+def _bump_state_version(cursor):
+    cursor.execute("UPDATE state_version SET version = version + 1 WHERE id = 1")
+    cursor.execute("SELECT version FROM state_version WHERE id = 1")
+    return cursor.fetchone()[0]
+
+def _bump_roster_version(cursor):
+    cursor.execute("UPDATE state_version SET roster_version = roster_version + 1 WHERE id = 1")
+    cursor.execute("SELECT roster_version FROM state_version WHERE id = 1")
+    return cursor.fetchone()[0]
+
+def get_state_version():
+    """Get the current state version (changes on every write, in any process)."""
+    with get_db() as db:
+        _cache.sync(db)
+        return _cache.version
+
+def get_roster_version():
+    """Get the participant roster version (changes on every roster import, in any process)."""
+    with get_db() as db:
+        _cache.sync(db)
+        return _cache.roster_version
+
+def get_external_change_count():
+    """Get how many times state was changed by another connection or process."""
+    with get_db() as db:
+        _cache.sync(db)
+        return _cache.external_changes
+
+def get_external_roster_change_count():
+    """Get how many times the roster was changed by another connection or process."""
+    with get_db() as db:
+        _cache.sync(db)
+        return _cache.external_roster_changes
+
+_executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="db")
+
+async def run(func, *args, **kwargs):
+    """Run a blocking database function on the database executor.
+
+    Async handlers should await this instead of calling database functions
+    directly, so disk reads, writes and fsyncs never block the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+def _migrate_baseline(cursor):
+    """Schema 1: the original tables, created idempotently over older databases."""
+    # Add draws table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS draws (
+            id INTEGER PRIMARY KEY,
+            count INTEGER DEFAULT 0
+        )
+    """)
+    
+    # Initialize draw count if not exists
+    cursor.execute("SELECT count FROM draws WHERE id = 1")
+    if not cursor.fetchone():
+        cursor.execute("INSERT OR IGNORE INTO draws (id, count) VALUES (1, 0)")
         
-        # Add draws table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS draws (
-                id INTEGER PRIMARY KEY,
-                count INTEGER DEFAULT 0
-            )
-        """)
+    # Create prize_status table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS prize_status (
+            type TEXT PRIMARY KEY,
+            total INTEGER,
+            remaining INTEGER
+        )
+    """)
+    
+    # Prize tiers are seeded per event from data/events.json (see prizes.py)
         
-        # Initialize draw count if not exists
-        cursor.execute("SELECT count FROM draws WHERE id = 1")
-        if not cursor.fetchone():
-            cursor.execute("INSERT INTO draws (id, count) VALUES (1, 0)")
-            
-        # Create prize_status table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS prize_status (
-                type TEXT PRIMARY KEY,
-                total INTEGER,
-                remaining INTEGER
-            )
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS winners (
+            participant_id INTEGER PRIMARY KEY,
+            prize_type TEXT,
+            draw_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT DEFAULT 'accepted' CHECK(status IN ('accepted', 'absent'))
+        )
+    """)
+    
+    # Create absent participants table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS absent_participants (
+            participant_id INTEGER PRIMARY KEY,
+            marked_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Create participants table (seeded from participants.json when empty)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS participants (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            photo TEXT NOT NULL
+        )
+    """)
+    
+    # Shared change counters used for cross-process cache invalidation
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS state_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0,
+            roster_version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    if "roster_version" not in _table_columns(cursor, "state_version"):
+        cursor.execute("ALTER TABLE state_version ADD COLUMN roster_version INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("INSERT OR IGNORE INTO state_version (id, version) VALUES (1, 0)")
+
+def _migrate_draw_events(cursor):
+    """Schema 2: append-only draw event journal and compacted state snapshots."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS draw_events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL CHECK(type IN ('draw', 'accept', 'absent', 'reset')),
+            version INTEGER NOT NULL,
+            participant_id INTEGER,
+            prize_type TEXT,
+            data TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    _create_journal_triggers(cursor)
+
+    # Materialized state as of journal sequence number `seq`
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS state_snapshots (
+            seq INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL,
+            state TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def _create_journal_triggers(cursor):
+    for action in ("UPDATE", "DELETE"):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS draw_events_no_{action.lower()}
+            BEFORE {action} ON draw_events
+            BEGIN
+                SELECT RAISE(ABORT, 'draw_events is append-only');
+            END
         """)
-        
-        # Initialize prize counts if not exists
-        cursor.execute("SELECT COUNT(*) FROM prize_status")
-        if cursor.fetchone()[0] == 0:
-            cursor.executemany(
-                "INSERT OR IGNORE INTO prize_status (type, total, remaining) VALUES (?, ?, ?)",
-                [
-                    ("SMALL", 20, 20),
-                    ("MEDIUM", 10, 10),
-                    ("BIG", 5, 5)
-                ]
+
+def _table_columns(cursor, table: str):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in cursor.fetchall()}
+
+def _migrate_events(cursor):
+    """Schema 3: per-event prize tiers and draw state; existing state moves to the default event."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    existing = 0
+    for table in ("prize_status", "winners", "absent_participants"):
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        existing += cursor.fetchone()[0]
+    if existing:
+        cursor.execute("INSERT OR IGNORE INTO events (id, name) VALUES (?, ?)", (DEFAULT_EVENT, "Lottery Draw"))
+
+    cursor.execute("""
+        CREATE TABLE prize_status_v3 (
+            event_id TEXT NOT NULL,
+            type TEXT NOT NULL,
+            rank INTEGER NOT NULL,
+            total INTEGER NOT NULL,
+            remaining INTEGER NOT NULL,
+            PRIMARY KEY (event_id, type)
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO prize_status_v3 (event_id, type, rank, total, remaining)
+        SELECT ?, type,
+               CASE type WHEN 'SMALL' THEN 0 WHEN 'MEDIUM' THEN 1 WHEN 'BIG' THEN 2 ELSE 3 END,
+               COALESCE(total, 0), COALESCE(remaining, 0)
+        FROM prize_status
+    """, (DEFAULT_EVENT,))
+
+    cursor.execute("""
+        CREATE TABLE draws_v3 (
+            event_id TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    if existing:
+        cursor.execute(
+            "INSERT INTO draws_v3 (event_id, count) SELECT ?, COALESCE(count, 0) FROM draws WHERE id = 1",
+            (DEFAULT_EVENT,)
+        )
+
+    cursor.execute("""
+        CREATE TABLE winners_v3 (
+            event_id TEXT NOT NULL,
+            participant_id INTEGER NOT NULL,
+            prize_type TEXT,
+            draw_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT DEFAULT 'accepted' CHECK(status IN ('accepted', 'absent')),
+            PRIMARY KEY (event_id, participant_id)
+        )
+    """)
+    # Very old databases predate winners.status and draw_time
+    columns = _table_columns(cursor, "winners")
+    draw_time = "draw_time" if "draw_time" in columns else "CURRENT_TIMESTAMP"
+    status = "COALESCE(status, 'accepted')" if "status" in columns else "'accepted'"
+    cursor.execute(f"""
+        INSERT INTO winners_v3 (event_id, participant_id, prize_type, draw_time, status)
+        SELECT ?, participant_id, prize_type, {draw_time}, {status} FROM winners
+    """, (DEFAULT_EVENT,))
+
+    cursor.execute("""
+        CREATE TABLE absent_participants_v3 (
+            event_id TEXT NOT NULL,
+            participant_id INTEGER NOT NULL,
+            marked_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (event_id, participant_id)
+        )
+    """)
+    marked_time = "marked_time" if "marked_time" in _table_columns(cursor, "absent_participants") else "CURRENT_TIMESTAMP"
+    cursor.execute(f"""
+        INSERT INTO absent_participants_v3 (event_id, participant_id, marked_time)
+        SELECT ?, participant_id, {marked_time} FROM absent_participants
+    """, (DEFAULT_EVENT,))
+
+    for table in ("prize_status", "draws", "winners", "absent_participants"):
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE {table}_v3 RENAME TO {table}")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_prize_status_rank ON prize_status (event_id, rank)")
+
+    cursor.execute(f"ALTER TABLE draw_events ADD COLUMN event_id TEXT NOT NULL DEFAULT '{DEFAULT_EVENT}'")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_draw_events_event ON draw_events (event_id, seq)")
+    # Snapshots now hold every event's state; compaction writes a new one
+    cursor.execute("DELETE FROM state_snapshots")
+
+def _migrate_winner_history(cursor):
+    """Schema 4: indexes for paging through winner history by (draw_time, participant_id)."""
+    # Keyset pagination skips rows whose sort key is NULL
+    cursor.execute("UPDATE winners SET draw_time = CURRENT_TIMESTAMP WHERE draw_time IS NULL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_winners_history ON winners (event_id, draw_time, participant_id)")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_winners_prize_type ON winners (event_id, prize_type, draw_time, participant_id)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_winners_status ON winners (event_id, status, draw_time, participant_id)"
+    )
+
+def _migrate_journal_types(cursor):
+    """Schema 5: drop the CHECK on draw_events.type; types are validated against journal.EVENT_TYPES."""
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'draw_events'")
+    row = cursor.fetchone()
+    last_seq = row[0] if row else 0
+    cursor.execute(f"""
+        CREATE TABLE draw_events_v5 (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            participant_id INTEGER,
+            prize_type TEXT,
+            data TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            event_id TEXT NOT NULL DEFAULT '{DEFAULT_EVENT}'
+        )
+    """)
+    cursor.execute(f"INSERT INTO draw_events_v5 ({EVENT_COLUMNS}) SELECT {EVENT_COLUMNS} FROM draw_events")
+    cursor.execute("DROP TABLE draw_events")
+    cursor.execute("ALTER TABLE draw_events_v5 RENAME TO draw_events")
+    # Sequence numbers are never reused, even past the last surviving row
+    cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'draw_events'")
+    cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('draw_events', ?)",
+                   (max(last_seq, _max_journal_seq(cursor)),))
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_draw_events_event ON draw_events (event_id, seq)")
+    _create_journal_triggers(cursor)
+
+def _migrate_winner_order(cursor):
+    """Schema 6: order winner history by journal sequence number instead of draw_time."""
+    cursor.execute("ALTER TABLE winners ADD COLUMN journal_seq INTEGER")
+    cursor.execute("""
+        WITH ordered AS (
+            SELECT rowid AS id,
+                   ROW_NUMBER() OVER (ORDER BY draw_time, participant_id) - COUNT(*) OVER () AS seq
+            FROM winners
+        )
+        UPDATE winners SET journal_seq = ordered.seq FROM ordered WHERE ordered.id = winners.rowid
+    """)
+    for index in ("idx_winners_history", "idx_winners_prize_type", "idx_winners_status"):
+        cursor.execute(f"DROP INDEX IF EXISTS {index}")
+    cursor.execute("CREATE INDEX idx_winners_history ON winners (event_id, journal_seq)")
+    cursor.execute("CREATE INDEX idx_winners_prize_type ON winners (event_id, prize_type, journal_seq)")
+    cursor.execute("CREATE INDEX idx_winners_status ON winners (event_id, status, journal_seq)")
+
+def _migrate_idempotency_keys(cursor):
+    """Schema 7: results of writes by idempotency key, shared by every worker."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            key TEXT PRIMARY KEY,
+            result TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created ON idempotency_keys (created_at)")
+
+def _migrate_task_runs(cursor):
+    """Schema 8: when each periodic task last ran, so one worker runs it per interval."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS task_runs (
+            name TEXT PRIMARY KEY,
+            last_run REAL NOT NULL,
+            marker TEXT NOT NULL DEFAULT ''
+        )
+    """)
+
+# Schema migrations, applied in order. PRAGMA user_version records how many
+# have run, so startup is a single pragma read once the schema is current.
+MIGRATIONS = [_migrate_baseline, _migrate_draw_events, _migrate_events, _migrate_winner_history,
+              _migrate_journal_types, _migrate_winner_order, _migrate_idempotency_keys, _migrate_task_runs]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def _schema_version(cursor) -> int:
+    cursor.execute("PRAGMA user_version")
+    return cursor.fetchone()[0]
+
+def migrate(cursor) -> int:
+    """Apply pending schema migrations in the caller's transaction; returns how many ran."""
+    pending = MIGRATIONS[_schema_version(cursor):]
+    for migration in pending:
+        migration(cursor)
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return len(pending)
+
+def init_db() -> int:
+    """Apply pending schema migrations; returns how many ran (0 when current)."""
+    with get_db() as db:
+        cursor = db.cursor()
+        if _schema_version(cursor) >= SCHEMA_VERSION:
+            return 0
+
+        # Several workers may start at once; serialize schema setup
+        cursor.execute("BEGIN IMMEDIATE")
+        pending = migrate(cursor)
+        version = None
+        if pending:
+            # Migrations rewrite state tables; journal the result like any other write
+            version = _bump_state_version(cursor)
+            _append_event(cursor, "migrate", version, journal.ALL_EVENTS,
+                          data={"schema": SCHEMA_VERSION, "state": _read_state(cursor)})
+
+        db.commit()
+        if version is not None:
+            _cache.invalidate(version)
+        return pending
+
+# Prize tiers are awarded in rank order within each event
+CURRENT_PRIZE_TYPE_SQL = """
+    SELECT type FROM prize_status
+    WHERE event_id = ? AND remaining > 0
+    ORDER BY rank
+    LIMIT 1
+"""
+
+def _read_current_prize_type(cursor, event_id: str):
+    cursor.execute(CURRENT_PRIZE_TYPE_SQL, (event_id,))
+    result = cursor.fetchone()
+    return result[0] if result else None
+
+def _read_prize_status(cursor, event_id: str):
+    # One ordered query; the current tier is the first with prizes left
+    cursor.execute(
+        "SELECT type, total, remaining FROM prize_status WHERE event_id = ? ORDER BY rank",
+        (event_id,)
+    )
+    results = cursor.fetchall()
+
+    status = {
+        "currentType": next((prize_type for prize_type, _, remaining in results if remaining > 0), None),
+        "remaining": {},
+        "total": {}
+    }
+
+    for prize_type, total, remaining in results:
+        status["remaining"][prize_type.lower()] = remaining
+        status["total"][prize_type.lower()] = total
+
+    return status
+
+def _load_events():
+    with get_db() as db:
+        cursor = db.cursor()
+        cursor.execute("SELECT id, name FROM events ORDER BY id")
+        events = {row[0]: {"id": row[0], "name": row[1], "tiers": []} for row in cursor.fetchall()}
+        cursor.execute("SELECT event_id, type, total FROM prize_status ORDER BY event_id, rank")
+        for event_id, prize_type, total in cursor.fetchall():
+            if event_id in events:
+                events[event_id]["tiers"].append({"type": prize_type, "total": total})
+        return events
+
+def get_events():
+    """Get configured events with their prize tiers in award order, keyed by id."""
+    return _cached("events", _load_events)[1]
+
+def configure_event(event_id: str, name: str, tiers):
+    """Create an event or replace its name and (type, total) prize tiers; returns the new state version."""
+    with get_db() as db:
+        cursor = db.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("""
+                INSERT INTO events (id, name) VALUES (?, ?)
+                ON CONFLICT(id) DO UPDATE SET name = excluded.name
+            """, (event_id, name))
+            cursor.execute(
+                "SELECT prize_type, COUNT(*) FROM winners WHERE event_id = ? GROUP BY prize_type",
+                (event_id,)
             )
-            
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS winners (
-                participant_id INTEGER PRIMARY KEY,
-                prize_type TEXT,
-                draw_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'accepted' CHECK(status IN ('accepted', 'absent'))
+            awarded = dict(cursor.fetchall())
+            cursor.execute("DELETE FROM prize_status WHERE event_id = ?", (event_id,))
+            cursor.executemany(
+                "INSERT INTO prize_status (event_id, type, rank, total, remaining) VALUES (?, ?, ?, ?, ?)",
+                [(event_id, prize_type, rank, total, max(0, total - awarded.get(prize_type, 0)))
+                 for rank, (prize_type, total) in enumerate(tiers)]
             )
-        """)
-        
-        # Create absent participants table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS absent_participants (
-                participant_id INTEGER PRIMARY KEY,
-                marked_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            cursor.execute("INSERT OR IGNORE INTO draws (event_id, count) VALUES (?, 0)", (event_id,))
+            cursor.execute(
+                "SELECT type, total, remaining FROM prize_status WHERE event_id = ? ORDER BY rank",
+                (event_id,)
             )
-        """)
-        
-        db.commit()
+            prizes = [list(row) for row in cursor.fetchall()]
+            version = _bump_state_version(cursor)
+            _append_event(cursor, "configure", version, event_id, data={
+                "name": name, "prizes": prizes, "drawCount": _read_draw_count(cursor, event_id)
+            })
+            db.commit()
+            _cache.invalidate(version)
+        except sqlite3.Error as e:
+            db.rollback()
+            raise Exception(f"Database error: {str(e)}")
+        return version
 
-def get_prize_status():
+def _load_prize_status(event_id: str):
+    with get_db() as db:
+        return _read_prize_status(db.cursor(), event_id)
+
+def get_prize_status_snapshot(event_id: str = DEFAULT_EVENT):
+    """Get (state version, prize status), served from the state cache."""
+    return _cached(("prize_status", event_id), functools.partial(_load_prize_status, event_id))
+
+def get_prize_status(event_id: str = DEFAULT_EVENT):
     """Get current prize status from database."""
+    return get_prize_status_snapshot(event_id)[1]
+
+def get_current_prize_type(event_id: str = DEFAULT_EVENT):
+    """Get the current prize type based on remaining prizes."""
+    return get_prize_status(event_id)["currentType"]
+
+def get_draw_state(event_id: str = DEFAULT_EVENT):
+    """Get the state a draw needs (prize type, winners, absentees, draw count) in one session."""
+    with get_db():
+        return {
+            "version": get_state_version(),
+            "currentType": get_current_prize_type(event_id),
+            "winners": get_winners(event_id),
+            "absent": get_absent_participants(event_id),
+            "drawCount": get_draw_count(event_id)
+        }
+
+def get_live_state(event_id: str = DEFAULT_EVENT):
+    """Get a snapshot of an event's full draw state for live subscribers."""
+    with get_db():
+        return {
+            "eventId": event_id,
+            "prizeStatus": get_prize_status(event_id),
+            "winners": sorted(get_winners(event_id)),
+            "absent": sorted(get_absent_participants(event_id)),
+            "drawCount": get_draw_count(event_id)
+        }
+
+def reset_all(event_id: str = DEFAULT_EVENT):
+    """Reset an event's winners, prizes and draw count in one transaction."""
+    reset_db(event_id, reset_draws=True)
+
+def _load_winners(event_id: str):
     with get_db() as db:
         cursor = db.cursor()
-        cursor.execute("SELECT type, total, remaining FROM prize_status")
-        results = cursor.fetchall()
-        
-        status = {
-            "currentType": get_current_prize_type(),
-            "remaining": {},
-            "total": {}
-        }
-        
-        for prize_type, total, remaining in results:
-            status["remaining"][prize_type.lower()] = remaining
-            status["total"][prize_type.lower()] = total
-            
-        return status
+        cursor.execute("SELECT participant_id FROM winners WHERE event_id = ?", (event_id,))
+        return get_participant_index().set_of(row[0] for row in cursor.fetchall())
+
+def get_winners_snapshot(event_id: str = DEFAULT_EVENT):
+    """Get (state version, winner ids as a ParticipantSet), served from the state cache."""
+    return _cached(("winners", event_id), functools.partial(_load_winners, event_id))
+
+def get_winners(event_id: str = DEFAULT_EVENT):
+    """Get list of previous winners."""
+    return get_winners_snapshot(event_id)[1]
+
+WINNER_STATUSES = ("accepted", "absent")
+
+def get_winner_history(event_id: str = DEFAULT_EVENT, after=None, limit: int = 100,
+                       prize_type: Optional[str] = None, status: Optional[str] = None):
+    """Get up to `limit` winners accepted after journal sequence number `after`, oldest first."""
+    conditions = ["w.event_id = ?"]
+    params = [event_id]
+    if prize_type is not None:
+        conditions.append("w.prize_type = ?")
+        params.append(prize_type)
+    if status is not None:
+        conditions.append("w.status = ?")
+        params.append(status)
+    if after is not None:
+        conditions.append("w.journal_seq > ?")
+        params.append(after)
+    params.append(limit)
 
-def get_current_prize_type():
-    """Get the current prize type based on remaining prizes."""
     with get_db() as db:
         cursor = db.cursor()
-        # Check prizes in order: SMALL -> MEDIUM -> BIG
-        for prize_type in ["SMALL", "MEDIUM", "BIG"]:
+        cursor.execute(f"""
+            SELECT w.participant_id, p.name, w.prize_type, w.draw_time, w.status, w.journal_seq
+            FROM winners w LEFT JOIN participants p ON p.id = w.participant_id
+            WHERE {" AND ".join(conditions)}
+            ORDER BY w.journal_seq
+            LIMIT ?
+        """, params)
+        return [
+            {"participantId": row[0], "name": row[1], "prizeType": row[2], "drawTime": row[3], "status": row[4],
+             "seq": row[5]}
+            for row in cursor.fetchall()
+        ]
+
+def _recall_result(cursor, idempotency_key: Optional[str]):
+    """The result stored for an idempotency key, marked as replayed, or None."""
+    if idempotency_key is None:
+        return None
+    cursor.execute(
+        "SELECT result FROM idempotency_keys WHERE key = ? AND created_at > ?",
+        (idempotency_key, time.time() - IDEMPOTENCY_TTL)
+    )
+    row = cursor.fetchone()
+    return {**json.loads(row[0]), "replayed": True} if row else None
+
+def _remember_result(cursor, idempotency_key: Optional[str], result):
+    """Store a write's result under its idempotency key, in the write's own transaction."""
+    if idempotency_key is None:
+        return
+    now = time.time()
+    cursor.execute("DELETE FROM idempotency_keys WHERE created_at <= ?", (now - IDEMPOTENCY_TTL,))
+    cursor.execute(
+        "INSERT OR REPLACE INTO idempotency_keys (key, result, created_at) VALUES (?, ?, ?)",
+        (idempotency_key, json.dumps(result, separators=(",", ":")), now)
+    )
+
+def accept_winner(participant_id: int, event_id: str = DEFAULT_EVENT, idempotency_key: Optional[str] = None):
+    """Accept a winner in a single transaction; returns the recorded result, or None if no prizes remain."""
+    with get_db() as db:
+        cursor = db.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            replayed = _recall_result(cursor, idempotency_key)
+            if replayed is None:
+                cursor.execute(
+                    "SELECT prize_type FROM winners WHERE event_id = ? AND participant_id = ?",
+                    (event_id, participant_id)
+                )
+                row = cursor.fetchone()
+                if row:
+                    cursor.execute("SELECT version FROM state_version WHERE id = 1")
+                    version = cursor.fetchone()[0]
+                    replayed = {
+                        "prizeType": row[0],
+                        "prizeStatus": _read_prize_status(cursor, event_id),
+                        "drawCount": _read_draw_count(cursor, event_id),
+                        "version": version,
+                        "replayed": True
+                    }
+            if replayed is not None:
+                db.rollback()
+                return replayed
+
+            prize_type = _read_current_prize_type(cursor, event_id)
+            if not prize_type:
+                db.rollback()
+                return None
+
             cursor.execute(
-                "SELECT remaining FROM prize_status WHERE type = ? AND remaining > 0",
-                (prize_type,)
+                "UPDATE prize_status SET remaining = remaining - 1 WHERE event_id = ? AND type = ?",
+                (event_id, prize_type)
             )
-            result = cursor.fetchone()
-            if result and result[0] > 0:
-                return prize_type
-    return None
+            cursor.execute("UPDATE draws SET count = count + 1 WHERE event_id = ?", (event_id,))
+            draw_count = _read_draw_count(cursor, event_id)
+            prize_status = _read_prize_status(cursor, event_id)
+            version = _bump_state_version(cursor)
+            seq = _append_event(cursor, "accept", version, event_id, participant_id, prize_type,
+                                {"drawCount": draw_count})
+            cursor.execute(
+                "INSERT INTO winners (event_id, participant_id, prize_type, journal_seq) VALUES (?, ?, ?, ?)",
+                (event_id, participant_id, prize_type, seq)
+            )
+            result = {
+                "prizeType": prize_type,
+                "prizeStatus": prize_status,
+                "drawCount": draw_count,
+                "version": version
+            }
+            _remember_result(cursor, idempotency_key, result)
+            db.commit()
+            _cache.invalidate(version)
+        except sqlite3.Error as e:
+            db.rollback()
+            raise Exception(f"Database error: {str(e)}")
 
-def get_winners():
-    """Get list of previous winners."""
+        return result
+
+class StaleStateError(Exception):
+    """Raised when a write was prepared against a state version that has since changed."""
+
+def get_idempotent_result(idempotency_key: str):
+    """The result stored for an idempotency key, marked as replayed, or None."""
     with get_db() as db:
-        cursor = db.cursor()
-        cursor.execute("SELECT participant_id FROM winners")
-        return {row[0] for row in cursor.fetchall()}
+        return _recall_result(db.cursor(), idempotency_key)
 
-def record_winner(participant_id: int, prize_type: str):
-    """Record a winner in the database."""
+def accept_winners(participant_ids, event_id: str = DEFAULT_EVENT, expected_version: Optional[int] = None,
+                   idempotency_key: Optional[str] = None):
+    """Accept a batch of drawn winners in one transaction; returns the recorded result, or None if prizes run short."""
+    participant_ids = list(participant_ids)
     with get_db() as db:
         cursor = db.cursor()
         try:
-            # Record winner
+            cursor.execute("BEGIN IMMEDIATE")
+            replayed = _recall_result(cursor, idempotency_key)
+            if replayed is not None:
+                db.rollback()
+                return replayed
+            cursor.execute("SELECT version FROM state_version WHERE id = 1")
+            version = cursor.fetchone()[0]
+            if expected_version is not None and version != expected_version:
+                db.rollback()
+                raise StaleStateError(f"State changed from version {expected_version} to {version}")
+
             cursor.execute(
-                "INSERT INTO winners (participant_id, prize_type) VALUES (?, ?)",
-                (participant_id, prize_type)
+                "SELECT type, remaining FROM prize_status WHERE event_id = ? AND remaining > 0 "
+                "ORDER BY rank LIMIT 1",
+                (event_id,)
+            )
+            current = cursor.fetchone()
+            if not current or current[1] < len(participant_ids):
+                db.rollback()
+                return None
+            prize_type = current[0]
+
+            first_draw = _read_draw_count(cursor, event_id) + 1
+            draw_numbers = list(range(first_draw, first_draw + len(participant_ids)))
+            # Each winner's history position is its draw event's sequence number
+            seqs = [
+                _append_event(cursor, "draw", version, event_id, participant_id, prize_type,
+                              {"drawNumber": draw_number})
+                for participant_id, draw_number in zip(participant_ids, draw_numbers)
+            ]
+
+            cursor.executemany(
+                "INSERT INTO winners (event_id, participant_id, prize_type, journal_seq) VALUES (?, ?, ?, ?)",
+                [(event_id, participant_id, prize_type, seq) for participant_id, seq in zip(participant_ids, seqs)]
             )
-            # Update prize count
             cursor.execute(
-                "UPDATE prize_status SET remaining = remaining - 1 WHERE type = ?",
-                (prize_type,)
+                "UPDATE prize_status SET remaining = remaining - ? WHERE event_id = ? AND type = ?",
+                (len(participant_ids), event_id, prize_type)
             )
+            cursor.execute("UPDATE draws SET count = count + ? WHERE event_id = ?",
+                           (len(participant_ids), event_id))
+            draw_count = _read_draw_count(cursor, event_id)
+            prize_status = _read_prize_status(cursor, event_id)
+            version = _bump_state_version(cursor)
+            _append_event(cursor, "accept", version, event_id, prize_type=prize_type,
+                          data={"ids": participant_ids, "drawCount": draw_count})
+            result = {
+                "ids": participant_ids,
+                "prizeType": prize_type,
+                "drawNumbers": draw_numbers,
+                "prizeStatus": prize_status,
+                "drawCount": draw_count,
+                "version": version
+            }
+            _remember_result(cursor, idempotency_key, result)
             db.commit()
+            _cache.invalidate(version)
         except sqlite3.Error as e:
             db.rollback()
             raise Exception(f"Database error: {str(e)}")
 
-def reset_db():
-    """Reset database to initial state."""
+        return result
+
+def reset_db(event_id: str = DEFAULT_EVENT, reset_draws: bool = False):
+    """Reset an event to its initial state; its history stays in the journal."""
     with get_db() as db:
         cursor = db.cursor()
         try:
             # Clear winners table
-            cursor.execute("DELETE FROM winners")
+            cursor.execute("DELETE FROM winners WHERE event_id = ?", (event_id,))
             
             # Clear absent participants
-            cursor.execute("DELETE FROM absent_participants")
+            cursor.execute("DELETE FROM absent_participants WHERE event_id = ?", (event_id,))
             
             # Reset prize counts
-            cursor.execute("""
-                UPDATE prize_status 
-                SET remaining = CASE 
-                    WHEN type = 'SMALL' THEN 20
-                    WHEN type = 'MEDIUM' THEN 10
-                    WHEN type = 'BIG' THEN 5
-                END
-            """)
+            cursor.execute("UPDATE prize_status SET remaining = total WHERE event_id = ?", (event_id,))
+            if reset_draws:
+                cursor.execute("UPDATE draws SET count = 0 WHERE event_id = ?", (event_id,))
+            draw_count = _read_draw_count(cursor, event_id)
+            version = _bump_state_version(cursor)
+            _append_event(cursor, "reset", version, event_id, data={"drawCount": draw_count})
             db.commit()
+            _cache.invalidate(version)
         except sqlite3.Error as e:
             db.rollback()
             raise Exception(f"Database error during reset: {str(e)}")
 
-def get_draw_count():
+def _read_draw_count(cursor, event_id: str):
+    cursor.execute("SELECT count FROM draws WHERE event_id = ?", (event_id,))
+    result = cursor.fetchone()
+    return result[0] if result else 0
+
+def _load_draw_count(event_id: str):
+    with get_db() as db:
+        return _read_draw_count(db.cursor(), event_id)
+
+def get_draw_count(event_id: str = DEFAULT_EVENT):
     """Get current draw count."""
+    return _cached(("draw_count", event_id), functools.partial(_load_draw_count, event_id))[1]
+
+def mark_participant_absent(participant_id: int, event_id: str = DEFAULT_EVENT,
+                            idempotency_key: Optional[str] = None):
+    """Mark a participant as absent and return the new state version."""
     with get_db() as db:
         cursor = db.cursor()
-        cursor.execute("SELECT count FROM draws WHERE id = 1")
-        result = cursor.fetchone()
-        return result[0] if result else 0
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            replayed = _recall_result(cursor, idempotency_key)
+            if replayed is None:
+                cursor.execute(
+                    "SELECT 1 FROM absent_participants WHERE event_id = ? AND participant_id = ?",
+                    (event_id, participant_id)
+                )
+                if cursor.fetchone():
+                    cursor.execute("SELECT version FROM state_version WHERE id = 1")
+                    replayed = {"version": cursor.fetchone()[0], "replayed": True}
+            if replayed is not None:
+                db.rollback()
+                return replayed
 
-def increment_draw_count():
-    """Increment and return new draw count."""
+            cursor.execute(
+                "INSERT INTO absent_participants (event_id, participant_id) VALUES (?, ?)",
+                (event_id, participant_id)
+            )
+            version = _bump_state_version(cursor)
+            _append_event(cursor, "absent", version, event_id, participant_id)
+            _remember_result(cursor, idempotency_key, {"version": version})
+            db.commit()
+            _cache.invalidate(version)
+        except sqlite3.Error as e:
+            db.rollback()
+            raise Exception(f"Database error: {str(e)}")
+        return {"version": version}
+
+def _load_absent_participants(event_id: str):
     with get_db() as db:
         cursor = db.cursor()
-        cursor.execute("UPDATE draws SET count = count + 1 WHERE id = 1")
-        cursor.execute("SELECT count FROM draws WHERE id = 1")
-        db.commit()
+        cursor.execute("SELECT participant_id FROM absent_participants WHERE event_id = ?", (event_id,))
+        return get_participant_index().set_of(row[0] for row in cursor.fetchall())
+
+def get_absent_participants_snapshot(event_id: str = DEFAULT_EVENT):
+    """Get (state version, absent ids as a ParticipantSet), served from the state cache."""
+    return _cached(("absent", event_id), functools.partial(_load_absent_participants, event_id))
+
+def get_absent_participants(event_id: str = DEFAULT_EVENT):
+    """Get list of absent participants."""
+    return get_absent_participants_snapshot(event_id)[1]
+
+# Dense bit positions of the roster, for the winner and absentee bitmaps
+_participant_index: Optional[DenseIndex] = None
+
+def get_participant_index() -> DenseIndex:
+    """Get the roster's DenseIndex, rebuilt when the roster version changes."""
+    global _participant_index
+    roster_version = get_roster_version()
+    index = _participant_index
+    if index is not None and index.roster_version == roster_version:
+        return index
+    with get_db() as db:
+        cursor = db.cursor()
+        cursor.execute("SELECT id FROM participants ORDER BY id")
+        index = DenseIndex((row[0] for row in cursor.fetchall()), roster_version)
+    _participant_index = index
+    return index
+
+def get_participants():
+    """Get the participant roster ordered by id."""
+    with get_db() as db:
+        cursor = db.cursor()
+        cursor.execute("SELECT id, name, photo FROM participants ORDER BY id")
+        return [{"id": row[0], "name": row[1], "photo": row[2]} for row in cursor.fetchall()]
+
+def count_participants():
+    """Get the number of participants in the roster."""
+    with get_db() as db:
+        cursor = db.cursor()
+        cursor.execute("SELECT COUNT(*) FROM participants")
         return cursor.fetchone()[0]
 
-def reset_draw_count():
-    """Reset draw count to 0."""
+def import_participants(rows, replace: bool = False):
+    """Insert, update or (with `replace`) remove roster rows in a single transaction."""
+    result = {"inserted": [], "updated": [], "unchanged": [], "duplicate": [], "removed": []}
+    seen = set()
+    upserts = []
     with get_db() as db:
         cursor = db.cursor()
-        cursor.execute("UPDATE draws SET count = 0 WHERE id = 1")
-        db.commit()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT id, name, photo FROM participants")
+            existing = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+            for participant_id, name, photo in rows:
+                if participant_id in seen:
+                    result["duplicate"].append(participant_id)
+                    continue
+                seen.add(participant_id)
+                if participant_id not in existing:
+                    result["inserted"].append(participant_id)
+                elif existing[participant_id] != (name, photo):
+                    result["updated"].append(participant_id)
+                else:
+                    result["unchanged"].append(participant_id)
+                    continue
+                upserts.append((participant_id, name, photo))
+
+            cursor.executemany("""
+                INSERT INTO participants (id, name, photo) VALUES (?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET name = excluded.name, photo = excluded.photo
+            """, upserts)
+
+            if replace:
+                result["removed"] = sorted(set(existing) - seen)
+                cursor.executemany(
+                    "DELETE FROM participants WHERE id = ?",
+                    [(participant_id,) for participant_id in result["removed"]]
+                )
+
+            roster_version = _bump_roster_version(cursor)
+            cursor.execute("SELECT version FROM state_version WHERE id = 1")
+            version = cursor.fetchone()[0]
+            db.commit()
+            _cache.invalidate(version, roster_version)
+        except sqlite3.Error as e:
+            db.rollback()
+            raise Exception(f"Database error: {str(e)}")
+
+    result["rosterVersion"] = roster_version
+    return result
+
+def mark_participants_absent(participant_ids, event_id: str = DEFAULT_EVENT,
+                             idempotency_key: Optional[str] = None):
+    """Mark many participants as absent in a single transaction."""
+    result = {"inserted": [], "duplicate": [], "unknown": []}
+    with get_db() as db:
+        cursor = db.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            replayed = _recall_result(cursor, idempotency_key)
+            if replayed is not None:
+                db.rollback()
+                return replayed
+            cursor.execute("SELECT id FROM participants")
+            known = {row[0] for row in cursor.fetchall()}
+            cursor.execute("SELECT participant_id FROM absent_participants WHERE event_id = ?", (event_id,))
+            absent = {row[0] for row in cursor.fetchall()}
+
+            for participant_id in participant_ids:
+                if participant_id not in known:
+                    result["unknown"].append(participant_id)
+                elif participant_id in absent:
+                    result["duplicate"].append(participant_id)
+                else:
+                    absent.add(participant_id)
+                    result["inserted"].append(participant_id)
+
+            if not result["inserted"]:
+                cursor.execute("SELECT version FROM state_version WHERE id = 1")
+                result["version"] = cursor.fetchone()[0]
+                db.rollback()
+                return result
 
-def mark_participant_absent(participant_id: int):
-    """Mark a participant as absent."""
+            cursor.executemany(
+                "INSERT INTO absent_participants (event_id, participant_id) VALUES (?, ?)",
+                [(event_id, participant_id) for participant_id in result["inserted"]]
+            )
+            version = _bump_state_version(cursor)
+            _append_event(cursor, "absent", version, event_id, data={"ids": result["inserted"]})
+            result["version"] = version
+            _remember_result(cursor, idempotency_key, result)
+            db.commit()
+            _cache.invalidate(version)
+        except sqlite3.Error as e:
+            db.rollback()
+            raise Exception(f"Database error: {str(e)}")
+
+    return result
+
+def _append_event(cursor, event_type: str, version: int, event_id: str,
+                  participant_id=None, prize_type=None, data=None):
+    """Append an event to the draw journal inside the caller's transaction."""
+    if event_type not in journal.EVENT_TYPES:
+        raise ValueError(f"Unknown journal event type: {event_type}")
+    cursor.execute(
+        "INSERT INTO draw_events (type, version, event_id, participant_id, prize_type, data) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (event_type, version, event_id, participant_id, prize_type,
+         json.dumps(data, separators=(",", ":")) if data is not None else None)
+    )
+    return cursor.lastrowid
+
+def _event_from_row(row):
+    seq, event_type, version, event_id, participant_id, prize_type, data, created_at = row
+    return {
+        "seq": seq,
+        "type": event_type,
+        "version": version,
+        "eventId": event_id,
+        "participantId": participant_id,
+        "prizeType": prize_type,
+        "data": json.loads(data) if data else None,
+        "createdAt": created_at
+    }
+
+EVENT_COLUMNS = "seq, type, version, event_id, participant_id, prize_type, data, created_at"
+
+def _max_journal_seq(cursor):
+    cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM draw_events")
+    return cursor.fetchone()[0]
+
+def record_draw(participant_id: int, prize_type: str, draw_number: int, event_id: str = DEFAULT_EVENT):
+    """Journal a drawn (not yet accepted) winner and return its sequence number."""
+    with get_db() as db:
+        cursor = db.cursor()
+        try:
+            cursor.execute("SELECT version FROM state_version WHERE id = 1")
+            version = cursor.fetchone()[0]
+            seq = _append_event(cursor, "draw", version, event_id, participant_id, prize_type,
+                                {"drawNumber": draw_number})
+            db.commit()
+        except sqlite3.Error as e:
+            db.rollback()
+            raise Exception(f"Database error: {str(e)}")
+        return seq
+
+def get_journal(after: int = 0, limit: int = 1000, event_id: Optional[str] = None):
+    """Get up to `limit` journal events with sequence numbers above `after`, optionally for one event."""
+    with get_db() as db:
+        cursor = db.cursor()
+        if event_id is None:
+            cursor.execute(
+                f"SELECT {EVENT_COLUMNS} FROM draw_events WHERE seq > ? ORDER BY seq LIMIT ?",
+                (after, limit)
+            )
+        else:
+            cursor.execute(
+                f"SELECT {EVENT_COLUMNS} FROM draw_events WHERE event_id IN (?, ?) AND seq > ? ORDER BY seq LIMIT ?",
+                (event_id, journal.ALL_EVENTS, after, limit)
+            )
+        return [_event_from_row(row) for row in cursor.fetchall()]
+
+def get_latest_snapshot():
+    """Get the most recent state snapshot, or None if none has been written."""
+    with get_db() as db:
+        cursor = db.cursor()
+        cursor.execute("SELECT seq, version, state, created_at FROM state_snapshots ORDER BY seq DESC LIMIT 1")
+        row = cursor.fetchone()
+        if not row:
+            return None
+        return {"seq": row[0], "version": row[1], "state": json.loads(row[2]), "createdAt": row[3]}
+
+def _read_state(cursor):
+    """Read every event's materialized draw state from the state tables as snapshot JSON."""
+    cursor.execute("SELECT id FROM events ORDER BY id")
+    events = {row[0]: {"prizes": [], "drawCount": 0, "winners": [], "absent": []} for row in cursor.fetchall()}
+    cursor.execute("SELECT event_id, type, total, remaining FROM prize_status ORDER BY event_id, rank")
+    for event_id, prize_type, total, remaining in cursor.fetchall():
+        if event_id in events:
+            events[event_id]["prizes"].append([prize_type, total, remaining])
+    cursor.execute("SELECT event_id, count FROM draws")
+    for event_id, count in cursor.fetchall():
+        if event_id in events:
+            events[event_id]["drawCount"] = count
+    cursor.execute("SELECT event_id, participant_id, prize_type, status FROM winners ORDER BY event_id, participant_id")
+    for event_id, participant_id, prize_type, status in cursor.fetchall():
+        if event_id in events:
+            events[event_id]["winners"].append([participant_id, prize_type, status])
+    cursor.execute("SELECT event_id, participant_id FROM absent_participants ORDER BY event_id, participant_id")
+    for event_id, participant_id in cursor.fetchall():
+        if event_id in events:
+            events[event_id]["absent"].append(participant_id)
+    return {"events": events}
+
+def _journal_tail(cursor, snapshot_seq: int):
+    cursor.execute(f"SELECT {EVENT_COLUMNS} FROM draw_events WHERE seq > ? ORDER BY seq", (snapshot_seq,))
+    return [_event_from_row(row) for row in cursor.fetchall()]
+
+def compact_journal(force: bool = False):
+    """Write a new state snapshot if the journal tail is long or no longer replays."""
     with get_db() as db:
         cursor = db.cursor()
         try:
+            # Serializes compaction across workers and pins a consistent view
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT seq, version, state FROM state_snapshots ORDER BY seq DESC LIMIT 1")
+            snapshot = cursor.fetchone()
+            cursor.execute("SELECT version FROM state_version WHERE id = 1")
+            version = cursor.fetchone()[0]
+            tail = _journal_tail(cursor, snapshot[0] if snapshot else 0)
+
+            if snapshot and not force and len(tail) < JOURNAL_COMPACT_EVENTS:
+                replayed = journal.replay(json.loads(snapshot[2]), snapshot[1], tail)
+                if replayed and replayed[0] == version:
+                    db.rollback()
+                    return None
+
+            seq = tail[-1]["seq"] if tail else (snapshot[0] if snapshot else 0)
+            cursor.execute(
+                "INSERT OR REPLACE INTO state_snapshots (seq, version, state) VALUES (?, ?, ?)",
+                (seq, version, json.dumps(_read_state(cursor), separators=(",", ":")))
+            )
             cursor.execute(
-                "INSERT INTO absent_participants (participant_id) VALUES (?)",
-                (participant_id,)
+                "DELETE FROM state_snapshots WHERE seq NOT IN "
+                "(SELECT seq FROM state_snapshots ORDER BY seq DESC LIMIT ?)",
+                (JOURNAL_SNAPSHOTS_KEPT,)
             )
             db.commit()
+        except sqlite3.Error as e:
+            db.rollback()
+            raise Exception(f"Database error during journal compaction: {str(e)}")
+        return seq
+
+# Tables a restore leaves alone: the append-only journal (a backup's journal
+# is a prefix of it) and its snapshots, the version counters and task runs
+RESTORE_KEPT_TABLES = {"draw_events", "state_snapshots", "state_version", "task_runs", "sqlite_sequence"}
+
+def restore_tables(path, backup_name: str):
+    """Replace the state tables with a migrated backup's in one transaction; returns (version, roster version)."""
+    with get_db() as db:
+        cursor = db.cursor()
+        cursor.execute("ATTACH DATABASE ? AS backup", (str(path),))
+        try:
+            # Blocks every other writer until the restore is journaled
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT name FROM main.sqlite_master WHERE type = 'table' ORDER BY name")
+            tables = [row[0] for row in cursor.fetchall() if row[0] not in RESTORE_KEPT_TABLES]
+            for table in tables:
+                cursor.execute(f"PRAGMA main.table_info({table})")
+                columns = ", ".join(row[1] for row in cursor.fetchall())
+                cursor.execute(f"DELETE FROM main.{table}")
+                cursor.execute(f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM backup.{table}")
+
+            cursor.execute("SELECT version, roster_version FROM main.state_version WHERE id = 1")
+            previous_version, previous_roster_version = cursor.fetchone()
+            cursor.execute("SELECT version, roster_version FROM backup.state_version WHERE id = 1")
+            restored_version, restored_roster_version = cursor.fetchone()
+            # Past both timelines, so no ETag is reused
+            version = max(previous_version, restored_version) + 1
+            roster_version = max(previous_roster_version, restored_roster_version) + 1
+            cursor.execute(
+                "UPDATE main.state_version SET version = ?, roster_version = ? WHERE id = 1",
+                (version, roster_version)
+            )
+            _append_event(cursor, "restore", version, journal.ALL_EVENTS,
+                          data={"backup": backup_name, "state": _read_state(cursor)})
+            db.commit()
+        except sqlite3.Error as e:
+            db.rollback()
+            raise Exception(f"Database error during restore: {str(e)}")
+        finally:
+            cursor.execute("DETACH DATABASE backup")
+
+    _cache.invalidate(version, roster_version)
+    return version, roster_version
+
+def claim_task(name: str, interval: float, marker: str = "") -> bool:
+    """Claim a run of a periodic task unless another worker ran it within `interval` seconds for the same `marker`."""
+    with get_db() as db:
+        cursor = db.cursor()
+        try:
+            now = time.time()
+            cursor.execute(
+                "INSERT INTO task_runs (name, last_run, marker) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET last_run = excluded.last_run, marker = excluded.marker "
+                "WHERE task_runs.last_run <= ? AND task_runs.marker != excluded.marker",
+                (name, now, marker, now - interval)
+            )
+            claimed = cursor.rowcount == 1
+            db.commit()
         except sqlite3.Error as e:
             db.rollback()
             raise Exception(f"Database error: {str(e)}")
+        return claimed
 
-def get_absent_participants():
-    """Get list of absent participants."""
+def release_task(name: str):
+    """Give up a claimed run that failed, so the next interval retries it on any worker."""
     with get_db() as db:
         cursor = db.cursor()
-        cursor.execute("SELECT participant_id FROM absent_participants")
-        return {row[0] for row in cursor.fetchall()}
\ No newline at end of file
+        try:
+            cursor.execute("DELETE FROM task_runs WHERE name = ?", (name,))
+            db.commit()
+        except sqlite3.Error as e:
+            db.rollback()
+            raise Exception(f"Database error: {str(e)}")
+
+def rebuild_state():
+    """Rebuild (state version, state) from the latest snapshot plus the journal tail, or None if it does not replay."""
+    with get_db() as db:
+        cursor = db.cursor()
+        # One read transaction so the snapshot, tail and version agree
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute("SELECT seq, version, state FROM state_snapshots ORDER BY seq DESC LIMIT 1")
+            snapshot = cursor.fetchone()
+            if not snapshot:
+                return None
+            tail = _journal_tail(cursor, snapshot[0])
+            cursor.execute("SELECT version FROM state_version WHERE id = 1")
+            version = cursor.fetchone()[0]
+        finally:
+            db.rollback()
+
+    replayed = journal.replay(json.loads(snapshot[2]), snapshot[1], tail)
+    if replayed is None or replayed[0] != version:
+        return None
+    return replayed
+
+def warm_cache() -> bool:
+    """Fill the state cache from the journal instead of querying each table."""
+    rebuilt = rebuild_state()
+    if rebuilt is None:
+        return False
+    version, states = rebuilt
+    values = {}
+    index = get_participant_index()
+    for event_id, state in states.items():
+        values[("prize_status", event_id)] = journal.prize_status(state)
+        values[("winners", event_id)] = index.set_of(state["winners"])
+        values[("absent", event_id)] = index.set_of(state["absent"])
+        values[("draw_count", event_id)] = state["drawCount"]
+    with get_db() as db:
+        _cache.sync(db)
+        return _cache.prime(version, values)
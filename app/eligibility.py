@@ -0,0 +1,82 @@
+import random
+from typing import Dict, Iterable, List, Optional
+
+
+class EligiblePool:
+    """Participant ids that can still win, with O(1) random selection.
+
+    Ids live in a list plus an id -> index map; removal swaps the last id
+    into the freed slot. Selection uses SystemRandom (os.urandom), so draws
+    do not depend on a seedable PRNG.
+
+    `version` is the database state version the pool reflects. Incremental
+    updates only apply when they are the very next version; anything else
+    marks the pool stale so the caller rebuilds it.
+    """
+
+    def __init__(self, ids: Iterable[int] = (), version: Optional[int] = None,
+                 roster_version: Optional[int] = None, rng: Optional[random.Random] = None):
+        self._ids: List[int] = []
+        self._index: Dict[int, int] = {}
+        self._rng = rng or random.SystemRandom()
+        self.version = version
+        self.roster_version = roster_version
+        for participant_id in ids:
+            self.add(participant_id)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, participant_id: int) -> bool:
+        return participant_id in self._index
+
+    def add(self, participant_id: int):
+        """Add an id to the pool."""
+        if participant_id in self._index:
+            return
+        self._index[participant_id] = len(self._ids)
+        self._ids.append(participant_id)
+
+    def remove(self, participant_id: int):
+        """Remove an id from the pool (no-op if absent)."""
+        index = self._index.pop(participant_id, None)
+        if index is None:
+            return
+        last = self._ids.pop()
+        if index < len(self._ids):
+            self._ids[index] = last
+            self._index[last] = index
+
+    def apply(self, participant_ids: Iterable[int], version: int):
+        """Remove ids because the write that produced `version` made them ineligible."""
+        if self.version is not None and version == self.version + 1:
+            for participant_id in participant_ids:
+                self.remove(participant_id)
+            self.version = version
+        else:
+            # Another write happened in between; force a rebuild
+            self.version = None
+
+    def is_current(self, version: int, roster_version: int) -> bool:
+        return self.version == version and self.roster_version == roster_version
+
+    def choice(self, exclude: Iterable[int] = ()) -> Optional[int]:
+        """Pick a uniformly random id, skipping any in `exclude`."""
+        excluded = set(exclude) & self._index.keys()
+        if len(self._ids) <= len(excluded):
+            return None
+        while True:
+            participant_id = self._ids[self._rng.randrange(len(self._ids))]
+            if participant_id not in excluded:
+                return participant_id
+
+    def sample(self, k: int, exclude: Iterable[int] = ()) -> Optional[List[int]]:
+        """Pick `k` distinct random ids without replacement, skipping any in `exclude`.
+
+        Returns None if fewer than `k` ids are eligible.
+        """
+        excluded = set(exclude)
+        population = [participant_id for participant_id in self._ids if participant_id not in excluded]
+        if k > len(population):
+            return None
+        return self._rng.sample(population, k)
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Per-subscriber queue size; subscribers that fall this far behind are dropped
+QUEUE_SIZE = int(os.environ.get("EVENT_QUEUE_SIZE", 100))
+# Number of recent events kept so reconnecting clients can resume
+HISTORY_SIZE = int(os.environ.get("EVENT_HISTORY_SIZE", 500))
+
+Event = Dict[str, Any]
+
+
+def format_sse(event: Event) -> str:
+    """Encode an event as a server-sent event frame."""
+    data = json.dumps(event["data"], separators=(",", ":"))
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+class Subscription:
+    """A single client's bounded event queue."""
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class EventBroadcaster:
+    """Fans out draw events to live subscribers.
+
+    Every event gets a monotonically increasing sequence number. Clients
+    resume from an id of the form "<instance>-<seq>": sequence numbers are
+    per process, so a cursor issued by another worker (or an earlier run of
+    this one) is not resumable here. A subscriber whose queue fills up is
+    dropped rather than allowed to slow down publishing.
+    """
+
+    def __init__(self, queue_size: int = QUEUE_SIZE, history_size: int = HISTORY_SIZE):
+        self.queue_size = queue_size
+        self.instance = os.urandom(4).hex()
+        self.seq = 0
+        self._history: Deque[Event] = deque(maxlen=history_size)
+        self._subscribers: Set[Subscription] = set()
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> Event:
+        """Publish an event to every subscriber. Must run on the event loop."""
+        self.seq += 1
+        event = {"seq": self.seq, "id": self.cursor(self.seq), "type": event_type, "data": data}
+        self._history.append(event)
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+        return event
+
+    def _drop(self, subscription: Subscription):
+        logger.warning("Dropping slow event subscriber")
+        self._subscribers.discard(subscription)
+        subscription.dropped = True
+        # Replace the backlog with an end-of-stream marker
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    def subscribe(self) -> Subscription:
+        """Register a new subscriber."""
+        subscription = Subscription(self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscriber."""
+        self._subscribers.discard(subscription)
+
+    def cursor(self, seq: int) -> str:
+        """The resume cursor (SSE event id) for sequence number `seq`."""
+        return f"{self.instance}-{seq}"
+
+    def parse_cursor(self, cursor: Optional[str]) -> Optional[int]:
+        """The sequence number in a cursor issued by this process, else None."""
+        instance, _, seq = (cursor or "").partition("-")
+        if instance != self.instance or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def mark_gap(self):
+        """Record that state changed without a published event.
+
+        Clients holding an older cursor then get a fresh snapshot instead of
+        a backlog that misses the change.
+        """
+        self.seq += 1
+        self._history.clear()
+
+    def since(self, cursor: int) -> Optional[List[Event]]:
+        """Return events after cursor, or None if they are no longer in history."""
+        if cursor > self.seq:
+            return None
+        if cursor == self.seq:
+            return []
+        if not self._history or self._history[0]["seq"] > cursor + 1:
+            return None
+        return [event for event in self._history if event["seq"] > cursor]
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+broadcaster = EventBroadcaster()
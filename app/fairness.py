@@ -0,0 +1,266 @@
+"""Offline fairness audit of the draw rules.
+
+Replays the remaining draw sequence of an event many times with NumPy and
+compares each participant's win counts, overall and per prize tier, with
+what a uniform draw over the eligible participants would give. The
+simulation follows the same rules as /draw and /accept-winner in main.py:
+
+- prizes are awarded tier by tier, in award order, one per draw;
+- winners and absentees are not eligible, and nobody wins twice;
+- the event's forced draws (prizes.forced_draws()) go to their fixed
+  participant, who is excluded from every other draw.
+
+Audit the current state of an event, or a synthetic roster:
+
+    python -m app.fairness --event default --simulations 1000000
+    python -m app.fairness --roster-size 100000 --output audit.json
+"""
+import argparse
+import json
+import logging
+import math
+import time
+from statistics import NormalDist
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only this audit needs it
+    np = None
+
+from . import database
+from .prizes import EVENTS_PATH, forced_draws, load_events
+
+logger = logging.getLogger(__name__)
+
+# Simulations sampled per NumPy batch, bounding memory use
+CHUNK_SIZE = 100_000
+# Most pool entries shuffled per batch when sampling from small pools
+SHUFFLE_BUDGET = 10_000_000
+
+# Remaining prizes in award order: (type, remaining)
+Tiers = Sequence[Tuple[str, int]]
+
+
+def draw_plan(tiers: Tiers, draw_count: int) -> List[Tuple[int, int]]:
+    """(draw number, tier index) for every prize still to be awarded."""
+    plan = []
+    draw_number = draw_count
+    for tier_index, (_, remaining) in enumerate(tiers):
+        for _ in range(remaining):
+            draw_number += 1
+            plan.append((draw_number, tier_index))
+    return plan
+
+
+def _sample_without_replacement(rng, population: int, draws: int, size: int):
+    """Ordered samples of `draws` distinct indices below `population`, one row per simulation.
+
+    Large pools sample with replacement and redraw the rows that repeat an
+    index, which is rare when draws**2 < population. Small pools shuffle
+    every row of the whole pool and keep its first `draws` entries.
+    """
+    if draws * draws < population:
+        picks = rng.integers(0, population, size=(size, draws))
+        while True:
+            ordered = np.sort(picks, axis=1)
+            repeated = np.flatnonzero((ordered[:, 1:] == ordered[:, :-1]).any(axis=1))
+            if not repeated.size:
+                return picks
+            picks[repeated] = rng.integers(0, population, size=(repeated.size, draws))
+    rows = np.broadcast_to(np.arange(population), (size, population))
+    return rng.permuted(rows, axis=1)[:, :draws]
+
+
+def simulate(eligible_ids: Sequence[int], tiers: Tiers, draw_count: int, simulations: int,
+             seed: Optional[int] = None, chunk_size: int = CHUNK_SIZE,
+             forced: Optional[Mapping[int, int]] = None) -> Dict[str, Any]:
+    """Simulate the remaining draws and count wins per tier and participant.
+
+    `forced` maps draw numbers to fixed winners, as prizes.forced_draws().
+    Returns the participant ids, a (tiers x participants) win count matrix,
+    the number of draws that took place per tier and, if the draws stop
+    early (the forced participant is unavailable, or nobody is left), the
+    draw number they stop at.
+    """
+    if np is None:
+        raise RuntimeError("NumPy is required for the fairness audit")
+    ids = np.array(sorted(set(int(participant_id) for participant_id in eligible_ids)), dtype=np.int64)
+    position = {int(participant_id): index for index, participant_id in enumerate(ids)}
+    plan = draw_plan(tiers, draw_count)
+
+    # Draws with a fixed winner, and the ids every other draw excludes
+    forced = forced or {}
+    fixed = {}
+    excluded = {position[pid] for pid in forced.values() if pid in position}
+    random_tiers = []
+    stopped_at = None
+    for draw_number, tier_index in plan:
+        forced_id = forced.get(draw_number)
+        if forced_id is not None:
+            if forced_id not in position:
+                stopped_at = draw_number
+                break
+            fixed[draw_number] = (tier_index, forced_id)
+        elif len(random_tiers) < len(ids) - len(excluded):
+            random_tiers.append(tier_index)
+        else:
+            stopped_at = draw_number
+            break
+
+    # Random draws sample from the pool without the excluded ids
+    pool = np.array([index for index in range(len(ids)) if index not in excluded], dtype=np.int64)
+    tier_codes = np.array(random_tiers, dtype=np.int64) * len(ids)
+    wins = np.zeros(len(tiers) * len(ids), dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    if len(random_tiers) ** 2 >= len(pool):
+        # Shuffling whole rows; keep each batch within SHUFFLE_BUDGET entries
+        chunk_size = max(1, min(chunk_size, SHUFFLE_BUDGET // max(1, len(pool))))
+    for start in range(0, simulations, chunk_size):
+        size = min(chunk_size, simulations - start)
+        if len(random_tiers):
+            picks = pool[_sample_without_replacement(rng, len(pool), len(random_tiers), size)]
+            wins += np.bincount((picks + tier_codes).ravel(), minlength=wins.size)
+    wins = wins.reshape(len(tiers), len(ids))
+    for tier_index, forced_id in fixed.values():
+        wins[tier_index, position[forced_id]] += simulations
+
+    draws_per_tier = [0] * len(tiers)
+    for tier_index in random_tiers + [tier_index for tier_index, _ in fixed.values()]:
+        draws_per_tier[tier_index] += 1
+    return {"ids": ids, "wins": wins, "draws": draws_per_tier, "stoppedAt": stopped_at}
+
+
+def chi_square_p_value(statistic: float, df: int) -> float:
+    """Upper tail of the chi-square distribution (Wilson-Hilferty approximation)."""
+    if df <= 0:
+        return 1.0
+    scale = 2 / (9 * df)
+    z = ((statistic / df) ** (1 / 3) - (1 - scale)) / math.sqrt(scale)
+    return 1 - NormalDist().cdf(z)
+
+
+def _uniformity(counts, simulations: int, draws: int) -> Optional[Dict[str, Any]]:
+    """Chi-square statistic and per-participant z-scores of counts against a uniform draw.
+
+    Under a uniform draw the winners of `draws` draws are a uniformly random
+    subset of the m eligible participants, so each count is binomial with
+    p = draws / m, and the counts are negatively correlated (their sum is
+    fixed). The statistic is scaled for that, giving m - 1 degrees of freedom.
+    """
+    m = counts.size
+    p = draws / m
+    if m < 2 or p <= 0 or p >= 1:
+        return None
+    expected = simulations * p
+    variance = simulations * p * (1 - p)
+    z = (counts - expected) / math.sqrt(variance)
+    statistic = float(np.sum(z ** 2) * (m - 1) / m)
+    return {
+        "draws": draws,
+        "expectedWins": expected,
+        "chiSquare": round(statistic, 3),
+        "df": m - 1,
+        "pValue": chi_square_p_value(statistic, m - 1),
+        "z": z,
+    }
+
+
+def audit(eligible_ids: Sequence[int], tiers: Tiers, draw_count: int, simulations: int,
+          seed: Optional[int] = None, alpha: float = 0.01, max_flagged: int = 50,
+          forced: Optional[Mapping[int, int]] = None) -> Dict[str, Any]:
+    """Simulate the remaining draws and test them against a uniform draw.
+
+    A participant is flagged when their overall or per-tier win count
+    deviates from uniform by more than a Bonferroni-corrected two-sided
+    threshold at level `alpha`.
+    """
+    started = time.perf_counter()
+    result = simulate(eligible_ids, tiers, draw_count, simulations, seed, forced=forced)
+    ids, wins = result["ids"], result["wins"]
+
+    tests = [("overall", wins.sum(axis=0), sum(result["draws"]))]
+    tests += [(prize_type, wins[index], result["draws"][index]) for index, (prize_type, _) in enumerate(tiers)]
+    stats = {name: _uniformity(counts, simulations, draws) for name, counts, draws in tests}
+    checked = [name for name, stat in stats.items() if stat is not None]
+    threshold = NormalDist().inv_cdf(1 - alpha / (2 * max(1, len(ids) * len(checked))))
+
+    # Largest deviation per participant across the tests
+    z_matrix = np.vstack([stats[name]["z"] for name in checked]) if checked else np.zeros((1, len(ids)))
+    worst = np.abs(z_matrix).max(axis=0)
+    flagged_indices = np.flatnonzero(worst > threshold)
+    flagged_indices = flagged_indices[np.argsort(-worst[flagged_indices], kind="stable")]
+    flagged = [{
+        "participantId": int(ids[index]),
+        "wins": {prize_type.lower(): int(wins[tier_index, index]) for tier_index, (prize_type, _) in enumerate(tiers)},
+        "z": {name: round(float(stats[name]["z"][index]), 2) for name in checked},
+    } for index in flagged_indices[:max_flagged]]
+
+    return {
+        "simulations": simulations,
+        "eligible": len(ids),
+        "drawCount": draw_count,
+        "stoppedAt": result["stoppedAt"],
+        "alpha": alpha,
+        "zThreshold": round(threshold, 3),
+        "tests": {name: {key: value for key, value in stat.items() if key != "z"}
+                  for name, stat in stats.items() if stat is not None},
+        "flaggedCount": int(flagged_indices.size),
+        "flagged": flagged,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def event_scenario(event_id: str = database.DEFAULT_EVENT) -> Tuple[List[int], List[Tuple[str, int]], int]:
+    """The eligible ids, remaining tiers and draw count of an event in the database."""
+    events = database.get_events()
+    if event_id not in events:
+        raise ValueError(f"Unknown event: {event_id}")
+    status = database.get_prize_status(event_id)
+    tiers = [(tier["type"], status["remaining"][tier["type"].lower()]) for tier in events[event_id]["tiers"]]
+    excluded = database.get_winners(event_id) | database.get_absent_participants(event_id)
+    eligible = [p["id"] for p in database.get_participants() if p["id"] not in excluded]
+    return eligible, tiers, database.get_draw_count(event_id)
+
+
+def synthetic_scenario(roster_size: int, event_id: str = database.DEFAULT_EVENT):
+    """A fresh event from events.json over participant ids 1..roster_size."""
+    _, tiers = load_events(EVENTS_PATH)[event_id]
+    return list(range(1, roster_size + 1)), tiers, 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the draw rules and test them for uniformity.")
+    parser.add_argument("--event", default=database.DEFAULT_EVENT, help="event to audit")
+    parser.add_argument("--roster-size", type=int, help="audit a fresh synthetic roster instead of the database")
+    parser.add_argument("--simulations", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--alpha", type=float, default=0.01, help="family-wise significance level for flags")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if np is None:
+        raise SystemExit("NumPy is not installed; pip install numpy to run the fairness audit")
+    if args.roster_size:
+        scenario = synthetic_scenario(args.roster_size, args.event)
+    else:
+        database.init_db()
+        scenario = event_scenario(args.event)
+    report = audit(*scenario, simulations=args.simulations, seed=args.seed, alpha=args.alpha,
+                   forced=forced_draws(args.event))
+
+    logger.info(f"{report['simulations']} simulations over {report['eligible']} eligible participants "
+                f"in {report['seconds']}s; {report['flaggedCount']} flagged")
+    for entry in report["flagged"][:10]:
+        logger.warning(f"Participant {entry['participantId']} deviates from uniform: z={entry['z']}")
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,111 @@
+"""Replaying responses to retried requests by idempotency key.
+
+Clients send an ``Idempotency-Key`` header with writes such as
+/accept-winner. The first request with a key runs normally and its
+successful response is kept for a while; retries with the same key get
+that response back without touching the database. A retry that arrives
+while the first request is still running waits for it instead.
+
+Responses are kept per worker process, for `ttl` seconds and at most
+`max_entries` keys (oldest first out). A retry that reaches another
+worker misses this cache; the write functions in database.py store each
+result under its key in the write's own transaction, so that worker
+replays it from the database instead of writing again.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+from starlette.responses import Response
+
+from .database import IDEMPOTENCY_TTL
+from .metrics import registry as metrics
+
+# How many responses are kept in memory (for IDEMPOTENCY_TTL seconds)
+IDEMPOTENCY_MAX_ENTRIES = int(os.environ.get("IDEMPOTENCY_MAX_ENTRIES", 10000))
+# Longest key accepted from clients
+MAX_KEY_LENGTH = 255
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+IDEMPOTENT_REQUESTS = metrics.counter(
+    "lottery_idempotent_requests_total", "Requests carrying an idempotency key by outcome", ["outcome"])
+
+# Stored response: (expires at, status code, body, headers)
+Entry = Tuple[float, int, bytes, Dict[str, str]]
+
+
+class IdempotencyCache:
+    """Bounded TTL cache of successful responses keyed by idempotency key."""
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL, max_entries: int = IDEMPOTENCY_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Entry]" = OrderedDict()
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expire(self, now: float):
+        # The TTL is fixed, so insertion order is also expiry order
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry[0] > now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[key]
+
+    @staticmethod
+    def _replay(entry: Entry) -> Response:
+        _, status_code, body, headers = entry
+        return Response(content=body, status_code=status_code, headers={**headers, REPLAYED_HEADER: "true"})
+
+    async def run(self, key: Hashable, handler: Callable[[], Awaitable[Response]]) -> Response:
+        """Return the stored response for `key`, or run `handler` and store its response.
+
+        Only 2xx responses are stored; errors propagate and a retry runs again.
+        Must run on the event loop.
+        """
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._entries.get(key)
+        if entry is not None:
+            IDEMPOTENT_REQUESTS.inc(outcome="replayed")
+            return self._replay(entry)
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            IDEMPOTENT_REQUESTS.inc(outcome="joined")
+            return self._replay(await asyncio.shield(pending))
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            response = await handler()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody may be waiting; don't log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+
+        headers = {name: value for name, value in response.headers.items() if name.lower() != "content-length"}
+        entry = (time.monotonic() + self.ttl, response.status_code, response.body, headers)
+        if 200 <= response.status_code < 300:
+            self._entries[key] = entry
+            self._expire(time.monotonic())
+        future.set_result(entry)
+        IDEMPOTENT_REQUESTS.inc(outcome="executed")
+        return response
+
+    def clear(self):
+        self._entries.clear()
+
+
+cache = IdempotencyCache()
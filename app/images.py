@@ -0,0 +1,157 @@
+"""Resized derivatives of participant photos.
+
+Grid thumbnails and a larger winner-modal variant are generated per photo
+and cached on disk under static/derived, named by the source's content
+hash, so a variant is only regenerated when its source image changes.
+
+Prebuild everything for the roster in participants.json with:
+
+    python -m app.images
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow is optional; fall back to the original photos
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Get the base directory
+BASE_DIR = Path(__file__).resolve().parent
+STATIC_DIR = BASE_DIR / "static"
+IMAGES_DIR = STATIC_DIR / "images"
+DERIVED_DIR = STATIC_DIR / "derived"
+
+# Longest edge in pixels for each variant
+VARIANTS = {
+    "thumb": int(os.environ.get("THUMB_SIZE", 320)),
+    "large": int(os.environ.get("LARGE_PHOTO_SIZE", 1024)),
+}
+QUALITY = 80
+
+
+def _content_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+class ImagePipeline:
+    """Generates and looks up resized photo variants.
+
+    A manifest maps each source photo to its size, mtime and content hash,
+    so unchanged sources are recognised without re-hashing them.
+    """
+
+    def __init__(self, images_dir: Path = IMAGES_DIR, derived_dir: Path = DERIVED_DIR):
+        self.images_dir = Path(images_dir)
+        self.derived_dir = Path(derived_dir)
+        self.manifest_path = self.derived_dir / "manifest.json"
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = self._read_manifest()
+        self.enabled = Image is not None
+        self.extension = "webp" if self.enabled and features.check("webp") else "jpg"
+        # Bumped whenever derivatives change, so rendered pages can be refreshed
+        self.version = 0
+
+    def _read_manifest(self) -> Dict[str, Dict]:
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_manifest(self):
+        self.derived_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _variant_name(self, content_hash: str, variant: str) -> str:
+        return f"{content_hash}-{variant}.{self.extension}"
+
+    def _render(self, source: Path, content_hash: str):
+        with Image.open(source) as original:
+            image = ImageOps.exif_transpose(original).convert("RGB")
+        for variant, size in VARIANTS.items():
+            target = self.derived_dir / self._variant_name(content_hash, variant)
+            if target.exists():
+                continue
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+            # Write then rename so other workers never see a partial file
+            tmp_path = target.with_name(target.name + ".tmp")
+            resized.save(tmp_path, format="WEBP" if self.extension == "webp" else "JPEG", quality=QUALITY)
+            os.replace(tmp_path, target)
+
+    def ensure(self, photo: str) -> Optional[Dict]:
+        """Make sure derivatives exist for a photo and return its manifest entry."""
+        if not self.enabled:
+            return None
+        source = self.images_dir / photo
+        try:
+            stat = source.stat()
+        except FileNotFoundError:
+            return None
+
+        entry = self._entries.get(photo)
+        signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if entry and all(entry.get(k) == v for k, v in signature.items()) and self._complete(entry):
+            return entry
+
+        content_hash = _content_hash(source)
+        self.derived_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            self._render(source, content_hash)
+        except Exception as e:
+            logger.error(f"Could not generate derivatives for {photo}: {str(e)}")
+            return None
+
+        entry = {**signature, "hash": content_hash,
+                 **{variant: self._variant_name(content_hash, variant) for variant in VARIANTS}}
+        with self._lock:
+            self._entries[photo] = entry
+            self.version += 1
+        return entry
+
+    def _complete(self, entry: Dict) -> bool:
+        return all(variant in entry and (self.derived_dir / entry[variant]).exists() for variant in VARIANTS)
+
+    def build(self, photos: Iterable[str]) -> int:
+        """Generate derivatives for every photo and save the manifest."""
+        version = self.version
+        count = sum(1 for photo in set(photos) if self.ensure(photo))
+        if self.version != version or not self.manifest_path.exists():
+            with self._lock:
+                self._write_manifest()
+        return count
+
+    def static_path(self, photo: str, variant: str) -> str:
+        """Path under /static for a photo variant, falling back to the original."""
+        entry = self._entries.get(photo)
+        if entry and variant in entry:
+            return f"derived/{entry[variant]}"
+        return f"images/{photo}"
+
+
+pipeline = ImagePipeline()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if not pipeline.enabled:
+        raise SystemExit("Pillow is not installed; nothing to do")
+    with open(BASE_DIR / "data" / "participants.json") as f:
+        roster_photos = [participant["photo"] for participant in json.load(f)]
+    built = pipeline.build(roster_photos)
+    logger.info(f"Derivatives ready for {built}/{len(set(roster_photos))} photos in {DERIVED_DIR}")
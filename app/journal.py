@@ -0,0 +1,151 @@
+"""Replaying the draw event journal over a state snapshot.
+
+Every draw, accept, absent, reset, event configuration, schema migration
+and backup restore is appended to the ``draw_events`` table with a sequence number. Periodically the
+materialized state is written to ``state_snapshots`` as of the latest
+sequence number, so the current state can be rebuilt from the last
+snapshot plus the events after it. This module holds the in-memory side of that; the SQL lives in
+database.py.
+
+Snapshot state (JSON), per event:
+
+    {"events": {event_id: {
+        "prizes": [[type, total, remaining], ...],   # in award order
+        "drawCount": int,
+        "winners": [[participant_id, prize_type, status], ...],
+        "absent": [participant_id, ...]}}}
+"""
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+EVENT_TYPES = ("draw", "accept", "absent", "reset", "configure", "restore", "migrate")
+
+# Events that change draw state. Each is written in the same transaction
+# as exactly one state version bump, so a replay can tell whether some
+# other write happened in between.
+STATE_EVENTS = {"accept", "absent", "reset", "configure", "restore", "migrate"}
+
+# State events that carry the whole resulting state. A replay starts from the
+# last one, so the events before it need not chain (e.g. in a migrated
+# database whose state predates the journal).
+CHECKPOINT_EVENTS = {"restore", "migrate"}
+
+# Event id of journal events that apply to every event (restores)
+ALL_EVENTS = "*"
+
+Event = Dict[str, Any]
+State = Dict[str, Any]
+
+
+def load_state(snapshot: State) -> Dict[str, State]:
+    """Convert snapshot JSON into mutable per-event states keyed by event id."""
+    return {event_id: _load_event_state(state) for event_id, state in snapshot["events"].items()}
+
+
+def dump_state(states: Dict[str, State]) -> State:
+    """Convert mutable per-event states back into snapshot JSON."""
+    return {"events": {event_id: _dump_event_state(state) for event_id, state in states.items()}}
+
+
+def _load_event_state(snapshot: State) -> State:
+    return {
+        "prizes": [list(prize) for prize in snapshot["prizes"]],
+        "drawCount": snapshot["drawCount"],
+        "winners": {participant_id: [prize_type, status]
+                    for participant_id, prize_type, status in snapshot["winners"]},
+        "absent": set(snapshot["absent"]),
+    }
+
+
+def _dump_event_state(state: State) -> State:
+    return {
+        "prizes": [list(prize) for prize in state["prizes"]],
+        "drawCount": state["drawCount"],
+        "winners": [[participant_id, prize_type, status]
+                    for participant_id, (prize_type, status) in sorted(state["winners"].items())],
+        "absent": sorted(state["absent"]),
+    }
+
+
+def apply_event(states: Dict[str, State], event: Event) -> bool:
+    """Apply one journal event to mutable per-event states.
+
+    Returns False if the event belongs to an event missing from `states`.
+    """
+    event_type = event["type"]
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown journal event type: {event_type}")
+    data = event.get("data") or {}
+    if event_type in CHECKPOINT_EVENTS:
+        # A restore or migration rewrote the tables; its state replaces everything
+        states.clear()
+        states.update(load_state(data["state"]))
+        return True
+    if event_type == "configure":
+        # Creates the event, or replaces its tiers
+        state = states.setdefault(event["eventId"], {"prizes": [], "drawCount": 0, "winners": {}, "absent": set()})
+        state["prizes"] = [list(prize) for prize in data["prizes"]]
+        state["drawCount"] = data["drawCount"]
+        return True
+    state = states.get(event["eventId"])
+    if state is None:
+        return False
+    if event_type == "accept":
+        # Batch draws accept several winners in one event
+        ids = data["ids"] if "ids" in data else [event["participantId"]]
+        for participant_id in ids:
+            state["winners"][participant_id] = [event["prizeType"], "accepted"]
+        for prize in state["prizes"]:
+            if prize[0] == event["prizeType"]:
+                prize[2] -= len(ids)
+        state["drawCount"] = data["drawCount"]
+    elif event_type == "absent":
+        ids = data["ids"] if "ids" in data else [event["participantId"]]
+        state["absent"].update(ids)
+    elif event_type == "reset":
+        state["winners"].clear()
+        state["absent"].clear()
+        for prize in state["prizes"]:
+            prize[2] = prize[1]
+        state["drawCount"] = data["drawCount"]
+    return True
+
+
+def replay(snapshot: State, snapshot_version: int,
+           events: Iterable[Event]) -> Optional[Tuple[int, Dict[str, State]]]:
+    """Rebuild (state version, per-event states) from a snapshot and the events after it.
+
+    Returns None if the events do not account for every state version since
+    the snapshot, i.e. something changed the state without journaling it.
+    """
+    events = list(events)
+    # Nothing before the last checkpoint matters; start from its state
+    checkpoints = [index for index, event in enumerate(events) if event["type"] in CHECKPOINT_EVENTS]
+    if checkpoints:
+        checkpoint = events[checkpoints[-1]]
+        if checkpoint["version"] <= snapshot_version:
+            return None
+        snapshot, snapshot_version = checkpoint["data"]["state"], checkpoint["version"]
+        events = events[checkpoints[-1] + 1:]
+    states = load_state(snapshot)
+    version = snapshot_version
+    for event in events:
+        if event["type"] in STATE_EVENTS:
+            if event["version"] != version + 1:
+                return None
+            version += 1
+        if not apply_event(states, event):
+            return None
+    return version, states
+
+
+def prize_status(state: State) -> Dict[str, Any]:
+    """An event's prize status in the shape served by /prize-status."""
+    status = {
+        "currentType": next((prize_type for prize_type, _, remaining in state["prizes"] if remaining > 0), None),
+        "remaining": {},
+        "total": {}
+    }
+    for prize_type, total, remaining in state["prizes"]:
+        status["remaining"][prize_type.lower()] = remaining
+        status["total"][prize_type.lower()] = total
+    return status
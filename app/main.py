@@ -1,19 +1,36 @@
-from fastapi import FastAPI, Request, HTTPException
+import time
+# Taken before the heavy imports so startup timings include import cost
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, Header, Request, HTTPException
 from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse, HTMLResponse
-from typing import List, Dict, Any, Optional
-from enum import Enum
-import json
+from fastapi.responses import JSONResponse, HTMLResponse, Response, StreamingResponse
+from typing import List, Dict, Any, Optional, AsyncIterator, Awaitable, Callable
 import random
 import asyncio
+import codecs
+import hashlib
+import csv
+import io
+import json
 import os
 import sys
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime
 from pathlib import Path
 import logging
-from . import database
+from contextlib import contextmanager
+import jinja2
+from . import backup, database, idempotency
+from .bitmap import DenseIndex, ParticipantSet
+from .eligibility import EligiblePool
+from .assets import FingerprintedStaticFiles, manifest as asset_manifest
+from .events import broadcaster, format_sse
+from .images import pipeline
+from .metrics import RequestMetricsMiddleware, monitor_event_loop_lag, registry as metrics
+from .participants import Participant, RosterError, registry, validate_record
+from .prizes import EventConfigError, forced_draws, seed_events, validate_event
 
 # Configure logging
 logging.basicConfig(
@@ -30,14 +47,33 @@ TEMPLATES_DIR = BASE_DIR / "templates"
 # Set debug mode
 DEBUG = os.environ.get("DEBUG", "false").lower() == "true"
 
+# Fast start skips directory listings at startup and checks roster photos in
+# the background instead of before serving; on by default outside DEBUG
+FAST_START = os.environ.get("FAST_START", "false" if DEBUG else "true").lower() == "true"
+
 # Get port from environment variable with fallback to 8000
 PORT = int(os.environ.get("PORT", 8000))
 
+# Event used by requests that do not pass ?event=
+DEFAULT_EVENT = database.DEFAULT_EVENT
+
+# Artificial suspense delay for /draw in seconds (set both to 0 to disable)
+DRAW_DELAY_MIN = float(os.environ.get("DRAW_DELAY_MIN", 1))
+DRAW_DELAY_MAX = float(os.environ.get("DRAW_DELAY_MAX", 2))
+
+# Seconds between event loop lag samples
+LOOP_LAG_INTERVAL = float(os.environ.get("LOOP_LAG_INTERVAL", 0.5))
+
+DRAW_DURATION = metrics.histogram(
+    "lottery_draw_duration_seconds",
+    "Time to serve /draw, with and without the artificial suspense delay", ["delay"])
+
 # Log startup information
-logger.info(f"Starting application with DEBUG={DEBUG}, PORT={PORT}")
-logger.info(f"Base directory: {BASE_DIR}")
-logger.info(f"Current working directory: {os.getcwd()}")
-logger.info(f"Python path: {sys.path}")
+logger.info(f"Starting application with DEBUG={DEBUG}, PORT={PORT}, FAST_START={FAST_START}")
+if not FAST_START:
+    logger.info(f"Base directory: {BASE_DIR}")
+    logger.info(f"Current working directory: {os.getcwd()}")
+    logger.info(f"Python path: {sys.path}")
 
 app = FastAPI(
     debug=DEBUG,
@@ -55,22 +91,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def install_static_url_for(templates: Jinja2Templates):
+    """Make url_for('static', path=...) in templates resolve to fingerprinted URLs."""
+    url_for = templates.env.globals["url_for"]
+
+    @jinja2.pass_context
+    def static_url_for(context, name: str, **path_params):
+        if name == "static" and "path" in path_params:
+            path_params["path"] = asset_manifest.url_path(path_params["path"])
+        return url_for(context, name, **path_params)
+
+    templates.env.globals["url_for"] = static_url_for
+
 try:
     # Mount static files
     logger.info(f"Mounting static files from: {STATIC_DIR}")
-    logger.info(f"Static directory exists: {STATIC_DIR.exists()}")
     if STATIC_DIR.exists():
-        logger.info(f"Static directory contents: {[f.name for f in STATIC_DIR.glob('**/*') if f.is_file()]}")
-        app.mount("/static", StaticFiles(directory=str(STATIC_DIR), html=True), name="static")
+        if not FAST_START:
+            logger.info(f"Static directory contents: {[f.name for f in STATIC_DIR.glob('**/*') if f.is_file()]}")
+        app.mount("/static", FingerprintedStaticFiles(directory=str(STATIC_DIR), html=True, manifest=asset_manifest), name="static")
     else:
         raise Exception(f"Static directory not found at {STATIC_DIR}")
 
     # Set up templates
     logger.info(f"Setting up templates from: {TEMPLATES_DIR}")
-    logger.info(f"Templates directory exists: {TEMPLATES_DIR.exists()}")
     if TEMPLATES_DIR.exists():
-        logger.info(f"Templates directory contents: {[f.name for f in TEMPLATES_DIR.glob('*') if f.is_file()]}")
+        if not FAST_START:
+            logger.info(f"Templates directory contents: {[f.name for f in TEMPLATES_DIR.glob('*') if f.is_file()]}")
         templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+        install_static_url_for(templates)
     else:
         raise Exception(f"Templates directory not found at {TEMPLATES_DIR}")
 except Exception as e:
@@ -78,103 +127,80 @@ except Exception as e:
     logger.exception("Full traceback:")
     raise
 
-# Type definition for participant
-Participant = Dict[str, str]
-
 def load_participants() -> List[Participant]:
-    """Load and validate participant data from JSON file."""
+    """Return the validated participant roster from the in-memory registry."""
     try:
-        # Use proper path joining
-        json_path = BASE_DIR / "data" / "participants.json"
-        with open(json_path) as f:
-            participants = json.load(f)
-            
-        if not participants:
-            raise ValueError("Participants list is empty")
-            
-        # Validate participant data
-        for participant in participants:
-            if not all(key in participant for key in ["id", "name", "photo"]):
-                raise ValueError("Invalid participant data format")
-                
-            # Verify image exists using correct path
-            image_path = BASE_DIR / "static" / "images" / participant['photo']
-            if not image_path.exists():
-                raise ValueError(f"Image not found: {participant['photo']}")
-                
-        return participants
-        
-    except FileNotFoundError as e:
-        raise HTTPException(status_code=500, detail=f"File not found: {str(e)}")
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Invalid JSON format in participants file")
-    except ValueError as e:
+        return registry.all()
+    except RosterError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Load participant data
-participants = load_participants()
-
-# Define prize types
-class PrizeType(Enum):
-    SMALL = "Small Prize"
-    MEDIUM = "Medium Prize"
-    BIG = "Big Prize"
-
-# Prize configuration
-PRIZE_CONFIG = {
-    PrizeType.SMALL: {"total": 20, "remaining": 20},
-    PrizeType.MEDIUM: {"total": 10, "remaining": 10},
-    PrizeType.BIG: {"total": 5, "remaining": 5}
-}
-
-# Track winners
-winners = set()  # Store winner IDs
-
-def get_current_prize_type() -> PrizeType:
-    """Determine current prize type based on remaining prizes."""
-    if PRIZE_CONFIG[PrizeType.SMALL]["remaining"] > 0:
-        return PrizeType.SMALL
-    elif PRIZE_CONFIG[PrizeType.MEDIUM]["remaining"] > 0:
-        return PrizeType.MEDIUM
-    elif PRIZE_CONFIG[PrizeType.BIG]["remaining"] > 0:
-        return PrizeType.BIG
-    else:
-        raise HTTPException(status_code=400, detail="No prizes remaining")
-
-def get_prize_status() -> Dict:
-    """Get current prize status."""
-    current_type = get_current_prize_type()
-    return {
-        "currentType": current_type.value,
-        "remaining": {
-            "small": PRIZE_CONFIG[PrizeType.SMALL]["remaining"],
-            "medium": PRIZE_CONFIG[PrizeType.MEDIUM]["remaining"],
-            "big": PRIZE_CONFIG[PrizeType.BIG]["remaining"]
-        },
-        "total": {
-            "small": PRIZE_CONFIG[PrizeType.SMALL]["total"],
-            "medium": PRIZE_CONFIG[PrizeType.MEDIUM]["total"],
-            "big": PRIZE_CONFIG[PrizeType.BIG]["total"]
+def with_photo_variants(participants: List[Participant]) -> List[Dict[str, Any]]:
+    """Add grid thumbnail and winner-modal photo paths to each participant."""
+    return [
+        {
+            **p,
+            "thumb": pipeline.static_path(p["photo"], "thumb"),
+            "large": pipeline.static_path(p["photo"], "large")
         }
-    }
+        for p in participants
+    ]
+
+def build_photo_derivatives() -> int:
+    """Generate resized photo variants for the current roster."""
+    return pipeline.build(p["photo"] for p in registry.all())
+
+def schedule_photo_derivatives():
+    """Build photo variants in the background without delaying requests."""
+    if pipeline.enabled:
+        app.state.image_task = asyncio.ensure_future(run_in_threadpool(build_photo_derivatives))
+
+# Rendered index pages keyed by (roster, photo, asset versions, base URL)
+INDEX_CACHE_SIZE = 8
+index_pages: Dict[tuple, Dict[str, Any]] = {}
+
+def render_index(request: Request, participants: List[Participant], event: Dict[str, Any]) -> bytes:
+    """Render the index page. Prize state is filled in client-side."""
+    template = templates.get_template("index.html")
+    return template.render({
+        "request": request,
+        "participants": with_photo_variants(participants),
+        "event": event
+    }).encode("utf-8")
+
+def not_modified(request: Request, etag: str) -> bool:
+    """Check whether the client's If-None-Match already covers this ETag."""
+    if_none_match = request.headers.get("if-none-match", "")
+    return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+async def require_event(event_id: str) -> Dict[str, Any]:
+    """Return an event's configuration, or raise 404 if it does not exist."""
+    events = await database.run(database.get_events)
+    if event_id not in events:
+        raise HTTPException(status_code=404, detail=f"Unknown event: {event_id}")
+    return events[event_id]
 
 @app.get("/", response_class=HTMLResponse)
-async def root(request: Request):
+async def root(request: Request, event: str = DEFAULT_EVENT):
     """Root endpoint"""
+    config = await require_event(event)
     try:
-        prize_status = database.get_prize_status()
-        winners = database.get_winners()
-        participants = load_participants()
-        
-        return templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "prize_status": prize_status,
-                "winners": winners,
-                "participants": participants
-            }
-        )
+        participants = await run_in_threadpool(load_participants)
+
+        tiers = tuple((tier["type"], tier["total"]) for tier in config["tiers"])
+        key = (registry.version, pipeline.version, asset_manifest.version, str(request.base_url),
+               event, config["name"], tiers)
+        page = index_pages.get(key)
+        if page is None:
+            body = await run_in_threadpool(render_index, request, participants, config)
+            page = {"body": body, "etag": f'"page-{hashlib.sha1(repr(key).encode()).hexdigest()[:16]}"'}
+            if len(index_pages) >= INDEX_CACHE_SIZE:
+                index_pages.clear()
+            index_pages[key] = page
+
+        headers = {"ETag": page["etag"], "Cache-Control": "no-cache"}
+        if not_modified(request, page["etag"]):
+            return Response(status_code=304, headers=headers)
+        return HTMLResponse(content=page["body"], headers=headers)
     except Exception as e:
         logger.error(f"Error in root endpoint: {str(e)}")
         return templates.TemplateResponse(
@@ -185,47 +211,107 @@ async def root(request: Request):
             }
         )
 
+# Per-event pools of participants who can still win, kept in step with accepts/absences
+eligible_pools: Dict[str, EligiblePool] = {}
+
+def build_eligible_pool(index: DenseIndex, state: Dict[str, Any], roster_version: int) -> EligiblePool:
+    """Build the eligible pool from the roster minus winners and absentees, bitwise."""
+    return EligiblePool(
+        index.everyone() - (state["winners"] | state["absent"]),
+        version=state["version"],
+        roster_version=roster_version
+    )
+
+async def get_eligible_pool(event_id: str, state: Dict[str, Any]) -> EligiblePool:
+    """Return an event's eligible pool, rebuilding it if state or roster changed elsewhere."""
+    # Tag the pool with the roster it is built from, not the registry's
+    index = await database.run(database.get_participant_index)
+    pool = eligible_pools.get(event_id)
+    if pool is None or not pool.is_current(state["version"], index.roster_version):
+        pool = await run_in_threadpool(build_eligible_pool, index, state, index.roster_version)
+        eligible_pools[event_id] = pool
+    return pool
+
+def apply_to_pools(event_id: str, participant_ids: List[int], version: int):
+    """Advance every pool past the write that produced `version`.
+
+    Only `event_id`'s pool loses the ids; the others just move to the new
+    version, since one event's accepts and absences don't affect another.
+    """
+    for pool_event, pool in eligible_pools.items():
+        pool.apply(participant_ids if pool_event == event_id else (), version)
+
+# Draws in progress per event; concurrent /draw calls share the pending one
+draws_in_flight: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+
+DRAWS_COALESCED = metrics.counter(
+    "lottery_draws_coalesced_total", "/draw calls answered by a draw already in progress")
+
 @app.get("/draw")
-async def draw():
+async def draw(event: str = DEFAULT_EVENT):
+    """Draw a winner for the event's current prize.
+
+    A double click or client retry while a draw is running gets the same
+    winner instead of starting another draw.
+    """
+    await require_event(event)
+    task = draws_in_flight.get(event)
+    if task is None:
+        task = asyncio.ensure_future(run_draw(event))
+        draws_in_flight[event] = task
+        task.add_done_callback(lambda done: finish_draw(event, done))
+    else:
+        DRAWS_COALESCED.inc()
+    # Shielded so one client disconnecting doesn't cancel the others' draw
+    return await asyncio.shield(task)
+
+def finish_draw(event: str, task: asyncio.Task):
+    if draws_in_flight.get(event) is task:
+        del draws_in_flight[event]
+    # Every caller may have disconnected; don't log the error as unretrieved
+    if not task.cancelled():
+        task.exception()
+
+async def run_draw(event: str) -> Dict[str, Any]:
+    started = time.perf_counter()
     try:
         # Load and verify participants
-        participants = load_participants()
+        participants = await run_in_threadpool(load_participants)
         if not participants:
             raise HTTPException(status_code=500, detail="Failed to load participants")
-            
+
+        state = await database.run(database.get_draw_state, event)
+
         # Get and verify current prize
-        current_prize = database.get_current_prize_type()
+        current_prize = state["currentType"]
         if not current_prize:
             raise HTTPException(status_code=400, detail="No prizes remaining")
-            
+
         # Get current state
-        winners = set(database.get_winners())  # Convert to set for faster lookups
-        current_draw = database.get_draw_count()
+        current_draw = state["drawCount"]
         next_draw = current_draw + 1
-        
-        # Get absent participants
-        absent_participants = database.get_absent_participants()
-        
-        # Verify we have participants data
-        available_participants = [p for p in participants if int(p["id"]) not in winners and int(p["id"]) not in absent_participants]
+
+        # Participants who are neither winners nor absent
+        available_participants = await get_eligible_pool(event, state)
         if not available_participants:
             raise HTTPException(status_code=400, detail="No eligible participants remaining")
             
         winner = None
+        forced = forced_draws(event)
         try:
-            if next_draw == 34:  # 34th draw
-                # Force select ID 57
-                Force_Winner = next((p for p in available_participants if int(p["id"]) == 57), None)
-                if not Force_Winner:
-                    raise HTTPException(status_code=400, detail="Participant 57 is not available for 34th draw")
-                winner = Force_Winner
+            forced_id = forced.get(next_draw)
+            if forced_id is not None:
+                if forced_id not in available_participants:
+                    raise HTTPException(status_code=400,
+                                        detail=f"Participant {forced_id} is not available for draw {next_draw}")
+                winner = registry.get(forced_id)
                 
             else:  # All other draws
-                # Exclude participant 57
-                eligible_participants = [p for p in available_participants if int(p["id"]) != 57]
-                if not eligible_participants:
+                # Exclude the participants whose draw is fixed
+                winner_id = available_participants.choice(exclude=forced.values())
+                if winner_id is None:
                     raise HTTPException(status_code=400, detail="No eligible participants remaining")
-                winner = random.choice(eligible_participants)
+                winner = registry.get(winner_id)
                 
         except Exception as e:
             logger.error(f"Error selecting winner: {str(e)}")
@@ -235,8 +321,9 @@ async def draw():
             raise HTTPException(status_code=500, detail="Failed to select a winner")
             
         # Add artificial delay for suspense
-        delay = random.uniform(1, 2)
-        await asyncio.sleep(delay)
+        delay = random.uniform(DRAW_DELAY_MIN, DRAW_DELAY_MAX)
+        if delay > 0:
+            await asyncio.sleep(delay)
         
         try:
             # Prepare response data without recording winner yet
@@ -244,13 +331,26 @@ async def draw():
                 "id": winner["id"],
                 "name": winner["name"],
                 "photo": winner["photo"],
+                "photoLarge": f"/static/{pipeline.static_path(winner['photo'], 'large')}",
                 "prizeType": current_prize,
-                "prizeStatus": database.get_prize_status()
+                "prizeStatus": await database.run(database.get_prize_status, event)
             }
-            
+
             # Get current draw count without incrementing
-            draw_count = database.get_draw_count()
+            draw_count = await database.run(database.get_draw_count, event)
+            await database.run(database.record_draw, winner["id"], current_prize, next_draw, event)
             
+            broadcaster.publish("draw", {
+                "eventId": event,
+                "id": winner["id"],
+                "prizeType": current_prize,
+                "drawCount": draw_count
+            })
+
+            elapsed = time.perf_counter() - started
+            DRAW_DURATION.observe(elapsed, delay="included")
+            DRAW_DURATION.observe(elapsed - delay, delay="excluded")
+
             # Return both winner and draw count
             return {
                 "winner": winner_data,
@@ -267,11 +367,121 @@ async def draw():
         logger.error(f"Unexpected error in draw_winner: {str(e)}")
         raise HTTPException(status_code=500, detail="Unexpected error occurred")
 
-# Add endpoint to get prize status
-@app.get("/prize-status")
-async def get_current_prize_status() -> JSONResponse:
-    """Get current prize status."""
-    return JSONResponse(content=get_prize_status())
+def pick_batch(pool: EligiblePool, first_draw: int, count: int, forced: Dict[int, int]) -> List[int]:
+    """Pick `count` distinct winners for draws numbered from `first_draw`.
+
+    Follows the same rules as /draw for each position: draws listed in
+    `forced` (the event's forced_draws()) go to their participant, and
+    every other draw excludes them.
+    """
+    fixed = [(position, forced[draw_number])
+             for position, draw_number in enumerate(range(first_draw, first_draw + count))
+             if draw_number in forced]
+    for position, forced_id in fixed:
+        if forced_id not in pool:
+            raise HTTPException(status_code=400,
+                                detail=f"Participant {forced_id} is not available for draw {first_draw + position}")
+    winner_ids = pool.sample(count - len(fixed), exclude=forced.values())
+    if winner_ids is None:
+        raise HTTPException(status_code=400, detail="Not enough eligible participants remaining")
+    for position, forced_id in fixed:
+        winner_ids.insert(position, forced_id)
+    return winner_ids
+
+# Times a batch draw is re-picked when another write lands in between
+BATCH_DRAW_ATTEMPTS = 3
+
+@app.post("/draw/batch")
+async def draw_batch(request: Request, count: Optional[int] = None, event: str = DEFAULT_EVENT,
+                     idempotency_key: Optional[str] = Header(None)):
+    """Draw and accept several winners of the current prize tier at once.
+
+    Winners are sampled without replacement from the eligible pool and
+    recorded in one transaction, without the suspense delay; the page
+    reveals them one by one. `count` defaults to the rest of the tier.
+    Retries carrying the same Idempotency-Key get the original winners back.
+    """
+    await require_event(event)
+    return await idempotent(request, event, idempotency_key,
+                            lambda stored_key: run_batch_draw(count, event, stored_key))
+
+def winner_payload(participant_id: int) -> Dict[str, Any]:
+    """A batch winner's roster details, as returned by /draw/batch."""
+    winner = registry.get(participant_id)
+    if winner is None:
+        return {"id": participant_id}
+    return {
+        "id": winner["id"],
+        "name": winner["name"],
+        "photo": winner["photo"],
+        "photoLarge": f"/static/{pipeline.static_path(winner['photo'], 'large')}"
+    }
+
+async def run_batch_draw(count: Optional[int], event: str, stored_key: Optional[str]) -> JSONResponse:
+    started = time.perf_counter()
+    try:
+        # A retry of a batch already written gets it back, even after its tier ran out
+        result = await database.run(database.get_idempotent_result, stored_key) if stored_key else None
+        if result is None:
+            for _ in range(BATCH_DRAW_ATTEMPTS):
+                # Picks up roster imports from any worker before picking
+                await run_in_threadpool(load_participants)
+                state = await database.run(database.get_draw_state, event)
+                current_prize = state["currentType"]
+                if not current_prize:
+                    raise HTTPException(status_code=400, detail="No prizes remaining")
+
+                remaining = (await database.run(database.get_prize_status, event))["remaining"][current_prize.lower()]
+                batch_size = remaining if count is None else count
+                if not 1 <= batch_size <= remaining:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"count must be between 1 and the {remaining} {current_prize} prizes remaining"
+                    )
+
+                pool = await get_eligible_pool(event, state)
+                winner_ids = pick_batch(pool, state["drawCount"] + 1, batch_size, forced_draws(event))
+                # Resolve every winner before writing; a miss means the roster moved on
+                if not all(registry.get(winner_id) for winner_id in winner_ids):
+                    continue
+                try:
+                    result = await database.run(
+                        database.accept_winners, winner_ids, event, state["version"], stored_key
+                    )
+                except database.StaleStateError:
+                    continue
+                break
+            else:
+                raise HTTPException(status_code=409, detail="Draw state kept changing; please try again")
+
+        if not result:
+            raise HTTPException(status_code=400, detail="No prizes remaining")
+
+        headers = replay_headers(result)
+        winners = [{**winner_payload(winner_id), "prizeType": result["prizeType"], "drawNumber": draw_number}
+                   for winner_id, draw_number in zip(result["ids"], result["drawNumbers"])]
+        if not headers:
+            apply_to_pools(event, result["ids"], result["version"])
+            for winner in winners:
+                broadcaster.publish("accept", {
+                    "eventId": event,
+                    "id": winner["id"],
+                    "prizeType": result["prizeType"],
+                    "prizeStatus": result["prizeStatus"],
+                    "drawCount": winner["drawNumber"]
+                })
+            DRAW_DURATION.observe(time.perf_counter() - started, delay="excluded")
+        return JSONResponse(content={
+            "winners": winners,
+            "prizeType": result["prizeType"],
+            "prizeStatus": result["prizeStatus"],
+            "drawCount": result["drawCount"]
+        }, headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in draw_batch: {str(e)}")
+        raise HTTPException(status_code=500, detail="Unexpected error occurred")
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
@@ -282,11 +492,36 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
     )
 
 # Initialize database on startup
-@app.on_event("startup")
-async def startup_event():
-    """Log application startup information"""
-    logger.info(f"Starting application with DEBUG={os.getenv('DEBUG', 'False')}, PORT={os.getenv('PORT', '8000')}")
-    logger.info(f"Base directory: {BASE_DIR}")
+# Milliseconds spent in each startup phase, reported by /health
+startup_timings: Dict[str, float] = {}
+
+@contextmanager
+def startup_phase(name: str):
+    """Record how long a startup phase takes in startup_timings."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+class FirstRequestTimer:
+    """ASGI middleware recording the time from import to the first HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and "first_request" not in startup_timings:
+            startup_timings["first_request"] = round((time.perf_counter() - IMPORT_STARTED) * 1000, 1)
+            logger.info(f"First request received {startup_timings['first_request']} ms after import")
+        await self.app(scope, receive, send)
+
+app.add_middleware(FirstRequestTimer)
+# Long-lived event streams are left out of the latency histograms
+app.add_middleware(RequestMetricsMiddleware, skip={"/stream"})
+
+def log_startup_environment():
+    """Log the static and template directory contents (skipped in fast start)."""
     logger.info(f"Current working directory: {os.getcwd()}")
     logger.info(f"Python path: {sys.path}")
     
@@ -308,66 +543,615 @@ async def startup_event():
     else:
         logger.warning("Templates directory does not exist")
 
-    database.init_db()
+async def validate_roster_photos():
+    """Check roster photos in the background and log any that are missing."""
+    with startup_phase("roster_validation"):
+        missing = await run_in_threadpool(registry.validate_photos)
+    if missing:
+        logger.error(f"{len(missing)} roster photos are missing: {missing[:10]}")
+
+@app.on_event("startup")
+async def startup_event():
+    """Prepare the database, roster and assets, timing each phase."""
+    startup_timings["import"] = round((time.perf_counter() - IMPORT_STARTED) * 1000, 1)
+    with startup_phase("startup"):
+        if not FAST_START:
+            log_startup_environment()
+
+        with startup_phase("init_db"):
+            migrations = await database.run(database.init_db)
+        if migrations:
+            logger.info(f"Applied {migrations} schema migration(s); schema version {database.SCHEMA_VERSION}")
+        with startup_phase("seed_events"):
+            await database.run(seed_events)
+        with startup_phase("seed_roster"):
+            await run_in_threadpool(registry.seed, not FAST_START)
+        with startup_phase("journal"):
+            await database.run(database.compact_journal)
+            await database.run(database.warm_cache)
+        with startup_phase("asset_manifest"):
+            await run_in_threadpool(asset_manifest.build)
+        schedule_photo_derivatives()
+        if FAST_START:
+            app.state.validation_task = asyncio.ensure_future(validate_roster_photos())
+
+        app.state.sync_task = asyncio.ensure_future(watch_external_changes())
+        app.state.loop_lag_task = asyncio.ensure_future(monitor_event_loop_lag(LOOP_LAG_INTERVAL))
+        app.state.compact_task = asyncio.ensure_future(compact_journal_periodically())
+        app.state.backup_task = (asyncio.ensure_future(backup_periodically())
+                                 if backup.BACKUP_INTERVAL > 0 else None)
+    logger.info(f"Startup phases (ms): {startup_timings}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks and close pooled database connections."""
+    app.state.sync_task.cancel()
+    app.state.loop_lag_task.cancel()
+    app.state.compact_task.cancel()
+    if app.state.backup_task:
+        app.state.backup_task.cancel()
+    database.close_pool()
+
+# Seconds between checks for state changes made by other worker processes
+STATE_SYNC_INTERVAL = float(os.environ.get("STATE_SYNC_INTERVAL", 1))
+
+async def watch_external_changes():
+    """Relay state and roster changes made by other workers to this worker's stream subscribers."""
+    seen = await database.run(database.get_external_change_count)
+    seen_roster = await database.run(database.get_external_roster_change_count)
+    while True:
+        await asyncio.sleep(STATE_SYNC_INTERVAL)
+        try:
+            roster_changes = await database.run(database.get_external_roster_change_count)
+            if roster_changes != seen_roster:
+                seen_roster = roster_changes
+                broadcaster.publish("roster", {"version": await database.run(database.get_roster_version)})
+            changes = await database.run(database.get_external_change_count)
+            if changes != seen:
+                seen = changes
+                if broadcaster.subscriber_count:
+                    for event_id in await database.run(database.get_events):
+                        broadcaster.publish("sync", await database.run(database.get_live_state, event_id))
+                else:
+                    # Nobody to send a sync to; make reconnecting clients take a snapshot
+                    broadcaster.mark_gap()
+        except Exception as e:
+            logger.error(f"Error checking for external state changes: {str(e)}")
+
+# Seconds between checks for whether the draw journal needs a new snapshot
+JOURNAL_COMPACT_INTERVAL = float(os.environ.get("JOURNAL_COMPACT_INTERVAL", 60))
+
+async def compact_journal_periodically():
+    """Snapshot the draw state whenever the journal tail grows long."""
+    while True:
+        await asyncio.sleep(JOURNAL_COMPACT_INTERVAL)
+        try:
+            seq = await database.run(database.compact_journal)
+            if seq is not None:
+                logger.info(f"Wrote state snapshot at journal sequence {seq}")
+        except Exception as e:
+            logger.error(f"Error compacting draw journal: {str(e)}")
+
+async def backup_periodically():
+    """Take a scheduled backup every BACKUP_INTERVAL seconds if anything changed."""
+    while True:
+        await asyncio.sleep(backup.BACKUP_INTERVAL)
+        claimed = False
+        try:
+            versions = (await database.run(database.get_state_version),
+                        await database.run(database.get_roster_version))
+            # Every worker runs this loop; only the one that claims the interval backs up
+            claimed = await database.run(database.claim_task, "backup", backup.BACKUP_INTERVAL,
+                                         f"{versions[0]}-{versions[1]}")
+            if claimed:
+                await run_in_threadpool(backup.create_backup, "scheduled")
+        except Exception as e:
+            logger.error(f"Scheduled backup failed: {str(e)}")
+            if claimed:
+                # Let the next interval retry, on whichever worker gets there first
+                await database.run(database.release_task, "backup")
+
+def versioned_response(request: Request, version: int, content: Any, variant: str = "") -> Response:
+    """Return JSON tagged with the state version, or 304 if the client has it.
+
+    `variant` distinguishes other representations of the same state.
+    """
+    etag = f'"state-{version}-{variant}"' if variant else f'"state-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=content, headers=headers)
 
 @app.get("/prize-status")
-async def get_prize_status():
+async def get_prize_status(request: Request, event: str = DEFAULT_EVENT):
     """Get current prize status."""
-    return JSONResponse(content=database.get_prize_status())
+    await require_event(event)
+    version, status = await database.run(database.get_prize_status_snapshot, event)
+    return versioned_response(request, version, status)
+
+# Encodings of participant id sets clients can opt into with ?encoding=
+PARTICIPANT_SET_ENCODINGS = ("ids", "bitmap", "ranges")
+
+def encode_participant_set(participants: ParticipantSet, encoding: str) -> Any:
+    """Encode a set of ids as a plain id list, a base64 roster bitmap or id ranges."""
+    if encoding == "ids":
+        return list(participants)
+    if encoding == "bitmap":
+        # Bit i is the i-th roster id in ascending order (see bitmap.py)
+        return {
+            "encoding": "bitmap",
+            "count": len(participants),
+            "rosterSize": len(participants.index),
+            "rosterVersion": participants.index.roster_version,
+            "bitmap": participants.to_base64(),
+            "extra": sorted(participants.extra)
+        }
+    return {"encoding": "ranges", "count": len(participants), "ranges": participants.ranges()}
+
+def check_encoding(encoding: str):
+    if encoding not in PARTICIPANT_SET_ENCODINGS:
+        raise HTTPException(status_code=400, detail=f"encoding must be one of {list(PARTICIPANT_SET_ENCODINGS)}")
+
+def encoding_variant(content: Any, encoding: str) -> str:
+    """ETag variant of an encoded id set; bitmaps also depend on the roster."""
+    if encoding == "bitmap":
+        return f"bitmap-{content['rosterVersion']}"
+    return "" if encoding == "ids" else encoding
 
 @app.get("/winners")
-async def get_winners():
-    """Get list of previous winners."""
-    return JSONResponse(content=list(database.get_winners()))
+async def get_winners(request: Request, event: str = DEFAULT_EVENT, encoding: str = "ids"):
+    """Get list of previous winners (?encoding=bitmap or ranges for a compact form)."""
+    await require_event(event)
+    check_encoding(encoding)
+    version, winners = await database.run(database.get_winners_snapshot, event)
+    content = await run_in_threadpool(encode_participant_set, winners, encoding)
+    return versioned_response(request, version, content, encoding_variant(content, encoding))
+
+WINNER_HISTORY_LIMIT = 1000
+# Rows fetched per query while streaming an export
+EXPORT_PAGE_SIZE = 500
+EXPORT_FIELDS = ["participantId", "name", "prizeType", "drawTime", "status"]
+
+def history_cursor(row: Dict[str, Any]) -> str:
+    """Cursor for the rows after `row`: its history sequence number."""
+    return str(row["seq"])
+
+def parse_history_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    try:
+        return int(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+
+def history_filters(prize_type: Optional[str], status: Optional[str]):
+    if status is not None and status not in database.WINNER_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {list(database.WINNER_STATUSES)}")
+    return (prize_type.upper() if prize_type else None), status
+
+@app.get("/winners/history")
+async def get_winner_history(after: Optional[str] = None, limit: int = 100, prize_type: Optional[str] = None,
+                             status: Optional[str] = None, event: str = DEFAULT_EVENT):
+    """Page through winners with prize type, draw time and status, oldest first.
+
+    Pass the returned `next` cursor as `after` to fetch the following page,
+    or to poll for winners accepted since. A page shorter than `limit` means
+    the history is exhausted for now; `next` is then still the cursor to
+    resume from.
+    """
+    await require_event(event)
+    prize_type, status = history_filters(prize_type, status)
+    limit = max(1, min(limit, WINNER_HISTORY_LIMIT))
+    winners = await database.run(
+        database.get_winner_history, event, parse_history_cursor(after), limit, prize_type, status
+    )
+    return {
+        "winners": winners,
+        "next": history_cursor(winners[-1]) if winners else after
+    }
+
+@app.get("/winners/export")
+async def export_winners(format: str = "csv", after: Optional[str] = None, prize_type: Optional[str] = None,
+                         status: Optional[str] = None, event: str = DEFAULT_EVENT):
+    """Stream the winner history as CSV or NDJSON, one page of rows at a time."""
+    await require_event(event)
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    prize_type, status = history_filters(prize_type, status)
+    cursor = parse_history_cursor(after)
+
+    def encode_csv(values: List[Any]) -> str:
+        line = io.StringIO()
+        csv.writer(line).writerow(values)
+        return line.getvalue()
+
+    async def rows():
+        nonlocal cursor
+        if format == "csv":
+            yield encode_csv(EXPORT_FIELDS)
+        while True:
+            page = await database.run(
+                database.get_winner_history, event, cursor, EXPORT_PAGE_SIZE, prize_type, status
+            )
+            for row in page:
+                if format == "csv":
+                    yield encode_csv([row[field] for field in EXPORT_FIELDS])
+                else:
+                    yield json.dumps(row, separators=(",", ":")) + "\n"
+            if len(page) < EXPORT_PAGE_SIZE:
+                break
+            cursor = page[-1]["seq"]
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(rows(), media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="winners-{event}.{format}"'
+    })
 
 @app.post("/reset")
-async def reset_draw():
-    """Reset the draw state to initial values."""
+async def reset_draw(event: str = DEFAULT_EVENT):
+    """Reset an event's draw state to initial values."""
+    await require_event(event)
+    # Resets can't be undone from the journal alone, so keep a restorable copy
     try:
-        database.reset_db()
-        database.reset_draw_count()  # Reset draw count too
-        return JSONResponse(content={"status": "success", "message": "Draw reset successfully"})
+        snapshot = await run_in_threadpool(backup.create_backup, "pre-reset")
+    except backup.BackupError as e:
+        logger.error(f"Reset aborted: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Backup before reset failed: {str(e)}")
+    try:
+        await database.run(database.reset_all, event)  # Resets draw count too
+        prize_status = await database.run(database.get_prize_status, event)
+        broadcaster.publish("reset", {"eventId": event, "prizeStatus": prize_status})
+        return JSONResponse(content={
+            "status": "success",
+            "message": "Draw reset successfully",
+            "prizeStatus": prize_status,
+            "backup": snapshot["name"]
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def idempotent(request: Request, event: str, key: Optional[str],
+                     handler: Callable[[Optional[str]], Awaitable[Response]]) -> Response:
+    """Run a write handler once per Idempotency-Key, replaying its response to retries.
+
+    The handler gets the key as stored in the database, which replays the
+    write's result to retries that reach another worker.
+    """
+    if key is None:
+        return await handler(None)
+    if not key or len(key) > idempotency.MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
+    # The same key on another route or event is a different request
+    stored_key = f"{request.url.path} {event} {key}"
+    return await idempotency.cache.run((request.url.path, event, key), lambda: handler(stored_key))
+
+def replay_headers(result: Dict[str, Any]) -> Dict[str, str]:
+    """Mark a response as replayed if the database returned an earlier write's result."""
+    return {idempotency.REPLAYED_HEADER: "true"} if result.pop("replayed", False) else {}
+
 @app.post("/mark-absent/{participant_id}")
-async def mark_participant_absent(participant_id: int):
+async def mark_participant_absent(request: Request, participant_id: int, event: str = DEFAULT_EVENT,
+                                  idempotency_key: Optional[str] = Header(None)):
     """Mark a participant as absent."""
+    await require_event(event)
+    return await idempotent(request, event, idempotency_key,
+                            lambda stored_key: record_absent_participant(participant_id, event, stored_key))
+
+async def record_absent_participant(participant_id: int, event: str, stored_key: Optional[str]) -> JSONResponse:
     try:
-        database.mark_participant_absent(participant_id)
-        return JSONResponse(content={"status": "success"})
+        result = await database.run(database.mark_participant_absent, participant_id, event, stored_key)
+        headers = replay_headers(result)
+        if not headers:
+            apply_to_pools(event, [participant_id], result["version"])
+            broadcaster.publish("absent", {"eventId": event, "id": participant_id})
+        return JSONResponse(content={"status": "success"}, headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/mark-absent")
+async def mark_participants_absent(request: Request, event: str = DEFAULT_EVENT,
+                                   idempotency_key: Optional[str] = Header(None)):
+    """Mark many participants as absent in one transaction.
+
+    Accepts a JSON list of ids or {"ids": [...]} and reports which ids were
+    inserted, were already absent (duplicate) or are not in the roster.
+    """
+    await require_event(event)
+    return await idempotent(request, event, idempotency_key,
+                            lambda stored_key: record_absent_participants(request, event, stored_key))
+
+async def record_absent_participants(request: Request, event: str, stored_key: Optional[str]) -> JSONResponse:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    participant_ids = body.get("ids") if isinstance(body, dict) else body
+    # No coercion: "12" would be iterated per character, 1.9 and true truncated to 1
+    if not isinstance(participant_ids, list) or not all(
+            isinstance(participant_id, int) and not isinstance(participant_id, bool)
+            for participant_id in participant_ids):
+        raise HTTPException(status_code=400, detail="Expected a list of integer participant ids")
+
+    try:
+        result = await database.run(database.mark_participants_absent, participant_ids, event, stored_key)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    headers = replay_headers(result)
+    if result["inserted"] and not headers:
+        apply_to_pools(event, result["inserted"], result["version"])
+        broadcaster.publish("absent", {"eventId": event, "ids": result["inserted"]})
+    return JSONResponse(content={"status": "success", **result}, headers=headers)
+
+async def read_roster_records(request: Request) -> AsyncIterator[Dict[str, Any]]:
+    """Yield roster records from a JSON array or a streamed CSV upload."""
+    content_type = request.headers.get("content-type", "")
+    if "csv" not in content_type:
+        try:
+            records = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON list of participants")
+        for record in records:
+            yield record
+        return
+
+    # Parse CSV line by line as the body arrives
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    header = None
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for row in csv.reader(lines):
+            if not row:
+                continue
+            if header is None:
+                header = [column.strip().lower() for column in row]
+                continue
+            yield dict(zip(header, row))
+    buffer += decoder.decode(b"", final=True)
+    for row in csv.reader(buffer.splitlines()):
+        if row and header is not None:
+            yield dict(zip(header, row))
+
+@app.post("/participants/import")
+async def import_participants(request: Request, replace: bool = False):
+    """Import roster entries from a JSON list or CSV upload (id, name, photo).
+
+    Entries are upserted in one transaction; with ?replace=true, roster
+    entries missing from the upload are removed. Reports per-id results.
+    """
+    rows = []
+    invalid = []
+    async for record in read_roster_records(request):
+        try:
+            rows.append(validate_record(record))
+        except (RosterError, AttributeError) as e:
+            invalid.append({"row": len(rows) + len(invalid) + 1, "error": str(e)})
+
+    if not rows:
+        raise HTTPException(status_code=400, detail="No valid participants in upload")
+
+    try:
+        result = await database.run(database.import_participants, rows, replace)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    schedule_photo_derivatives()
+    broadcaster.publish("roster", {"version": result["rosterVersion"]})
+    return JSONResponse(content={"status": "success", **result, "invalid": invalid})
+
+@app.post("/participants/reload")
+async def reload_participants():
+    """Replace the participant roster with the contents of participants.json."""
+    try:
+        result = await run_in_threadpool(registry.reload)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    count = len(result["inserted"]) + len(result["updated"]) + len(result["unchanged"])
+    schedule_photo_derivatives()
+    broadcaster.publish("roster", {"version": registry.version})
+    return JSONResponse(content={"status": "success", "count": count, **result})
+
 @app.get("/absent-participants")
-async def get_absent_participants():
-    """Get list of absent participants."""
+async def get_absent_participants(request: Request, event: str = DEFAULT_EVENT, encoding: str = "ids"):
+    """Get list of absent participants (?encoding=bitmap or ranges for a compact form)."""
+    await require_event(event)
+    check_encoding(encoding)
     try:
-        absent = database.get_absent_participants()
-        return JSONResponse(content=list(absent))
+        version, absent = await database.run(database.get_absent_participants_snapshot, event)
+        content = await run_in_threadpool(encode_participant_set, absent, encoding)
+        return versioned_response(request, version, content, encoding_variant(content, encoding))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/accept-winner/{participant_id}")
-async def accept_winner(participant_id: int):
-    """Record an accepted winner."""
+async def accept_winner(request: Request, participant_id: int, event: str = DEFAULT_EVENT,
+                        idempotency_key: Optional[str] = Header(None)):
+    """Record an accepted winner.
+
+    Retries carrying the same Idempotency-Key get the original response back.
+    """
+    await require_event(event)
+    return await idempotent(request, event, idempotency_key,
+                            lambda stored_key: record_accepted_winner(participant_id, event, stored_key))
+
+async def record_accepted_winner(participant_id: int, event: str, stored_key: Optional[str]) -> JSONResponse:
     try:
-        current_prize = database.get_current_prize_type()
-        if not current_prize:
+        result = await database.run(database.accept_winner, participant_id, event, stored_key)
+        if not result:
             raise HTTPException(status_code=400, detail="No prizes remaining")
-            
-        # Record winner and update counts
-        database.record_winner(participant_id, current_prize)
-        database.increment_draw_count()
-        
+
+        headers = replay_headers(result)
+        if not headers:
+            apply_to_pools(event, [participant_id], result["version"])
+            broadcaster.publish("accept", {
+                "eventId": event,
+                "id": participant_id,
+                "prizeType": result["prizeType"],
+                "prizeStatus": result["prizeStatus"],
+                "drawCount": result["drawCount"]
+            })
+
         return JSONResponse(content={
             "status": "success",
-            "prizeStatus": database.get_prize_status(),
-            "drawCount": database.get_draw_count()
-        })
+            "prizeStatus": result["prizeStatus"],
+            "drawCount": result["drawCount"]
+        }, headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Seconds between keep-alive comments on idle event streams
+STREAM_KEEPALIVE = 15
+
+def for_event(event: Dict[str, Any], event_id: str) -> bool:
+    """Whether a broadcast event concerns `event_id` (roster changes concern all)."""
+    return event["data"].get("eventId", event_id) == event_id
+
+@app.get("/stream")
+async def stream_events(request: Request, cursor: Optional[str] = None, event: str = DEFAULT_EVENT):
+    """Stream an event's draw, accept, absent and reset events as server-sent events.
+
+    New clients first receive a snapshot event whose id is the resume
+    cursor. Reconnecting clients (Last-Event-ID or ?cursor=) get the events
+    they missed instead, or a fresh snapshot if those are no longer held or
+    the cursor came from another worker.
+    """
+    await require_event(event)
+    resume_seq = broadcaster.parse_cursor(request.headers.get("last-event-id") or cursor)
+
+    subscription = broadcaster.subscribe()
+    resume_cursor = broadcaster.seq
+    backlog = broadcaster.since(resume_seq) if resume_seq is not None else None
+
+    async def event_stream():
+        try:
+            if backlog is None:
+                snapshot = await database.run(database.get_live_state, event)
+                yield format_sse({"seq": resume_cursor, "id": broadcaster.cursor(resume_cursor),
+                                  "type": "snapshot", "data": snapshot})
+            else:
+                for missed in backlog:
+                    if for_event(missed, event):
+                        yield format_sse(missed)
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), timeout=STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    break
+                if for_event(message, event):
+                    yield format_sse(message)
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/events")
+async def list_events():
+    """List configured events and their prize tiers in award order."""
+    events = await database.run(database.get_events)
+    return list(events.values())
+
+@app.put("/events/{event_id}")
+async def configure_event(event_id: str, request: Request):
+    """Create an event or replace its name and prize tiers.
+
+    Expects {"name": ..., "tiers": [{"type": ..., "total": ...}, ...]} with
+    tiers in award order. Prizes already awarded count against the new totals.
+    """
+    try:
+        body = await request.json()
+        name, tiers = validate_event(event_id, body if isinstance(body, dict) else {})
+    except (EventConfigError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        await database.run(database.configure_event, event_id, name, tiers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    events = await database.run(database.get_events)
+    broadcaster.publish("sync", await database.run(database.get_live_state, event_id))
+    return JSONResponse(content={"status": "success", **events[event_id]})
+
+# Largest page of journal events returned by /journal
+JOURNAL_PAGE_LIMIT = 1000
+
+@app.get("/journal")
+async def get_journal(after: int = 0, limit: int = JOURNAL_PAGE_LIMIT, event: Optional[str] = None):
+    """Export draw journal events after sequence number `after`, oldest first.
+
+    Clients replicating the journal pass the returned `next` cursor as
+    `after` on their next call. ?event= limits the export to one event.
+    """
+    limit = max(1, min(limit, JOURNAL_PAGE_LIMIT))
+    events = await database.run(database.get_journal, after, limit, event)
+    return {
+        "events": events,
+        "next": events[-1]["seq"] if events else after
+    }
+
+@app.get("/journal/snapshot")
+async def get_journal_snapshot():
+    """Export the latest compacted state snapshot."""
+    snapshot = await database.run(database.get_latest_snapshot)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="No snapshot has been written yet")
+    return snapshot
+
+@app.get("/backups")
+async def list_backups():
+    """List database backups, newest first."""
+    return {"backups": await run_in_threadpool(backup.list_backups)}
+
+@app.post("/backups")
+async def create_backup():
+    """Take a backup now and report its size, pages copied and duration."""
+    try:
+        return await run_in_threadpool(backup.create_backup, "manual")
+    except backup.BackupError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/backups/{name}/restore")
+async def restore_backup(name: str):
+    """Replace the database with a backup (after backing up the current one).
+
+    Every cache derived from the old state is dropped and open pages are
+    told to reload.
+    """
+    if name not in {entry["name"] for entry in await run_in_threadpool(backup.list_backups)}:
+        raise HTTPException(status_code=404, detail=f"No such backup: {name}")
+    try:
+        result = await run_in_threadpool(backup.restore_backup, name)
+    except backup.BackupError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    eligible_pools.clear()
+    index_pages.clear()
+    idempotency.cache.clear()
+    await run_in_threadpool(registry.all)
+    # No eventId, so every event's pages get it
+    broadcaster.publish("reset", {"restored": name})
+    return {"status": "success", **result}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Expose metrics in the Prometheus text format."""
+    database.update_pool_metrics()
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Add health check endpoint
 @app.get("/health")
 async def health_check():
@@ -379,7 +1163,12 @@ async def health_check():
             "templates_dir_exists": TEMPLATES_DIR.exists(),
             "cwd": os.getcwd(),
             "base_dir": str(BASE_DIR),
-            "python_path": sys.path
+            "python_path": sys.path,
+            "db_pool": database.get_pool_stats(),
+            "stream_subscribers": broadcaster.subscriber_count,
+            "fast_start": FAST_START,
+            "startup_ms": startup_timings,
+            "missing_photos": registry.missing_photos
         }
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
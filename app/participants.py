@@ -0,0 +1,132 @@
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from . import database
+
+logger = logging.getLogger(__name__)
+
+# Get the base directory
+BASE_DIR = Path(__file__).resolve().parent
+PARTICIPANTS_PATH = BASE_DIR / "data" / "participants.json"
+IMAGES_DIR = BASE_DIR / "static" / "images"
+
+# Type definition for participant
+Participant = Dict[str, str]
+
+# Roster row as stored in the participants table
+ParticipantRow = Tuple[int, str, str]
+
+
+class RosterError(ValueError):
+    """Raised when the participant roster cannot be loaded or is invalid."""
+
+
+def validate_record(record: Mapping[str, Any]) -> ParticipantRow:
+    """Validate one roster record and return it as an (id, name, photo) row."""
+    if not isinstance(record, Mapping) or not all(key in record for key in ["id", "name", "photo"]):
+        raise RosterError("Invalid participant data format")
+    try:
+        participant_id = int(record["id"])
+    except (TypeError, ValueError):
+        raise RosterError(f"Invalid participant id: {record['id']!r}")
+    name = str(record["name"]).strip()
+    photo = str(record["photo"]).strip()
+    if not name or not photo:
+        raise RosterError(f"Participant {participant_id} needs a name and photo")
+    return participant_id, name, photo
+
+
+class ParticipantRegistry:
+    """In-memory participant roster backed by the participants table.
+
+    The roster is loaded once and indexed by integer id. It is only re-read
+    when the roster version in the database changes, i.e. after an import
+    in any worker. participants.json seeds an empty table and can be
+    re-imported with reload(). Photo checks can be deferred to
+    validate_photos() so they do not hold up startup.
+    """
+
+    def __init__(self, path: Path = PARTICIPANTS_PATH, images_dir: Path = IMAGES_DIR):
+        self.path = Path(path)
+        self.images_dir = Path(images_dir)
+        self._lock = threading.Lock()
+        self._participants: List[Participant] = []
+        self._by_id: Dict[int, Participant] = {}
+        self.version: Optional[int] = None
+        # Photos referenced by the roster but not on disk; None until checked
+        self.missing_photos: Optional[List[str]] = None
+
+    def load_file(self, check_photos: bool = True) -> List[ParticipantRow]:
+        """Parse and validate the roster file, optionally checking photos exist."""
+        try:
+            with open(self.path) as f:
+                participants = json.load(f)
+        except FileNotFoundError as e:
+            raise RosterError(f"File not found: {str(e)}")
+        except json.JSONDecodeError:
+            raise RosterError("Invalid JSON format in participants file")
+
+        if not participants:
+            raise RosterError("Participants list is empty")
+
+        rows = []
+        for participant in participants:
+            row = validate_record(participant)
+
+            # Verify image exists
+            if check_photos and not (self.images_dir / row[2]).exists():
+                raise RosterError(f"Image not found: {row[2]}")
+            rows.append(row)
+
+        return rows
+
+    def seed(self, check_photos: bool = True) -> bool:
+        """Import the roster file if the participants table is empty."""
+        if database.count_participants():
+            return False
+        rows = self.load_file(check_photos)
+        database.import_participants(rows)
+        logger.info(f"Seeded {len(rows)} participants from {self.path.name}")
+        return True
+
+    def _refresh(self, force: bool = False) -> None:
+        roster_version = database.get_roster_version()
+        if not force and roster_version == self.version:
+            return
+        with self._lock:
+            if not force and roster_version == self.version:
+                return
+            participants = database.get_participants()
+            if not participants:
+                raise RosterError("Participants list is empty")
+            self._participants = participants
+            self._by_id = {int(p["id"]): p for p in participants}
+            self.version = roster_version
+            logger.info(f"Loaded {len(participants)} participants (roster version {self.version})")
+
+    def all(self) -> List[Participant]:
+        """Return the roster, reloading first if it has changed."""
+        self._refresh()
+        return self._participants
+
+    def get(self, participant_id: int) -> Optional[Participant]:
+        """Look up a participant by integer id in the loaded roster."""
+        return self._by_id.get(int(participant_id))
+
+    def validate_photos(self) -> List[str]:
+        """Record and return the roster photos missing from the images directory."""
+        photos = {p["photo"] for p in self.all()}
+        self.missing_photos = sorted(photo for photo in photos if not (self.images_dir / photo).exists())
+        return self.missing_photos
+
+    def reload(self) -> Dict[str, Any]:
+        """Replace the roster with the contents of the roster file."""
+        result = database.import_participants(self.load_file(), replace=True)
+        self._refresh(force=True)
+        return result
+
+
+registry = ParticipantRegistry()
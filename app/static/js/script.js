@@ -4,14 +4,18 @@ import confetti from 'https://cdn.skypack.dev/canvas-confetti';
 class LotteryDraw {
     constructor() {
         this.drawBtn = document.getElementById('drawBtn');
+        this.drawBatchBtn = document.getElementById('drawBatchBtn');
         this.participants = document.querySelectorAll('.participant-card');
         this.nameDisplay = document.getElementById('nameDisplay');
         this.currentName = document.getElementById('currentName');
         this.container = document.querySelector('.participants-container');
         this.isDrawing = false;
+        this.isBatchDrawing = false;
         this.currentAnimation = null;
         this.drawCountDisplay = document.getElementById('drawCountDisplay');
-        this.totalDraws = 35;
+        this.drawTotal = document.getElementById('drawTotal');
+        // Prizes in this event across all tiers, from /prize-status
+        this.totalDraws = null;
         
         // Initialize modals
         this.winnerModal = new bootstrap.Modal(document.getElementById('winnerModal'), {
@@ -40,9 +44,9 @@ class LotteryDraw {
         
         // Add prize status elements
         this.currentPrizeType = document.getElementById('currentPrizeType');
-        this.smallPrizeCount = document.getElementById('smallPrizeCount');
-        this.mediumPrizeCount = document.getElementById('mediumPrizeCount');
-        this.bigPrizeCount = document.getElementById('bigPrizeCount');
+        // One counter per prize tier of this event, keyed by lower-case tier type
+        this.prizeCounts = document.querySelectorAll('[data-prize-count]');
+        this.eventId = document.body.dataset.event || 'default';
         
         // Track current winner
         this.currentWinner = null;
@@ -61,22 +65,107 @@ class LotteryDraw {
         this.resetBtn = document.getElementById('resetBtn');
         
         // Add celebration sound
-        this.grandFinaleSound = new Audio('/static/sounds/celebration.mp3');
-        
-        // Initialize draw counter
-        this.drawCounter = document.getElementById('drawCounter');
+        // Sound URLs are fingerprinted by the server; fall back to the plain paths
+        this.celebrationSoundUrl = document.body.dataset.celebrationSound || '/static/sounds/celebration.mp3';
+        this.tickSoundUrl = document.body.dataset.tickSound || '/static/sounds/tick.mp3';
+        this.grandFinaleSound = new Audio(this.celebrationSoundUrl);
         
         // Setup all event listeners
         this.setupEventListeners();
         
-        // Load initial data
-        this.loadPreviousWinners();
-        this.loadAbsentParticipants();
+        // Load initial data, then stay in sync through the live event stream
+        if (window.EventSource) {
+            this.connectLiveUpdates();
+        } else {
+            this.loadPrizeStatus();
+            this.loadPreviousWinners();
+            this.loadAbsentParticipants();
+        }
+    }
+
+    connectLiveUpdates() {
+        // EventSource reconnects on its own and resumes from the last event id
+        this.eventSource = new EventSource(this.apiUrl('/stream'));
+        
+        this.eventSource.addEventListener('snapshot', (event) => {
+            this.applySnapshot(JSON.parse(event.data));
+        });
+        
+        // Changes made through another server worker arrive as a full snapshot
+        this.eventSource.addEventListener('sync', (event) => {
+            const snapshot = JSON.parse(event.data);
+            const winnerIds = new Set(snapshot.winners.map(String));
+            const removed = Array.from(document.querySelectorAll('.participant-card.previous-winner'))
+                .some(card => !winnerIds.has(card.dataset.id));
+            if (removed) {
+                // Winners were cleared (e.g. a reset), so start from a clean page
+                window.location.reload();
+                return;
+            }
+            this.applySnapshot(snapshot);
+        });
+        
+        this.eventSource.addEventListener('accept', (event) => {
+            // A batch draw reveals its own winners one by one
+            if (this.isBatchDrawing) return;
+            const data = JSON.parse(event.data);
+            this.markWinner(data.id);
+            this.updatePrizeStatus(data.prizeStatus);
+            this.updateDrawCount(data.drawCount);
+        });
+        
+        this.eventSource.addEventListener('absent', (event) => {
+            const data = JSON.parse(event.data);
+            (data.ids || [data.id]).forEach(id => this.markAbsent(id));
+        });
+        
+        // The participant grid changed, so re-render it
+        this.eventSource.addEventListener('roster', () => {
+            window.location.reload();
+        });
+        
+        this.eventSource.addEventListener('reset', () => {
+            window.location.reload();
+        });
+    }
+
+    newIdempotencyKey() {
+        return window.crypto && crypto.randomUUID
+            ? crypto.randomUUID()
+            : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    }
+
+    idempotencyHeaders() {
+        return this.currentActionKey ? { 'Idempotency-Key': this.currentActionKey } : {};
+    }
+
+    // Scope an API path to this page's event
+    apiUrl(path) {
+        const separator = path.includes('?') ? '&' : '?';
+        return `${path}${separator}event=${encodeURIComponent(this.eventId)}`;
+    }
+
+    applySnapshot(snapshot) {
+        snapshot.winners.forEach(winnerId => this.markWinner(winnerId));
+        snapshot.absent.forEach(id => this.markAbsent(id));
+        this.updatePrizeStatus(snapshot.prizeStatus);
+        this.updateDrawCount(snapshot.drawCount);
+    }
+
+    markAbsent(participantId) {
+        const card = document.querySelector(`[data-id="${participantId}"]`);
+        if (card) {
+            card.classList.add('absent');
+        }
+        this.absentParticipants.add(parseInt(participantId));
     }
 
     setupEventListeners() {
         // Draw button
         this.drawBtn.addEventListener('click', () => this.startDraw());
+        if (this.drawBatchBtn) {
+            this.drawBatchBtn.addEventListener('click', () => this.startBatchDraw());
+        }
         
         // Winner action buttons
         if (this.markAbsentBtn) {
@@ -106,8 +195,9 @@ class LotteryDraw {
         }
         
         try {
-            const response = await fetch(`/mark-absent/${this.currentWinner.id}`, {
-                method: 'POST'
+            const response = await fetch(this.apiUrl(`/mark-absent/${this.currentWinner.id}`), {
+                method: 'POST',
+                headers: this.idempotencyHeaders()
             });
             
             if (!response.ok) {
@@ -139,8 +229,9 @@ class LotteryDraw {
         }
         
         try {
-            const response = await fetch(`/accept-winner/${this.currentWinner.id}`, {
-                method: 'POST'
+            const response = await fetch(this.apiUrl(`/accept-winner/${this.currentWinner.id}`), {
+                method: 'POST',
+                headers: this.idempotencyHeaders()
             });
             
             if (!response.ok) {
@@ -175,14 +266,16 @@ class LotteryDraw {
         
         // Store current winner for absent/accept handling
         this.currentWinner = winner;
+        // Repeated clicks on this winner's buttons reuse the key, so they are recorded once
+        this.currentActionKey = this.newIdempotencyKey();
         
-        // Check if this is the final draw (35th draw)
-        if (drawCount === 34) {
+        // The event's last prize gets the grand finale
+        if (this.isFinalDraw(drawCount + 1)) {
             console.log('Showing grand finale celebration'); // Debug log
             await this.showGrandFinaleCelebration(winner);
         } else {
             // Regular winner celebration
-            document.getElementById('winnerPhoto').src = `/static/images/${winner.photo}`;
+            document.getElementById('winnerPhoto').src = this.largePhotoUrl(winner);
             document.getElementById('winnerName').textContent = winner.name;
             
             if (winner.prizeStatus) {
@@ -216,6 +309,11 @@ class LotteryDraw {
         }
     }
 
+    largePhotoUrl(winner) {
+        // Prefer the resized modal variant; fall back to the original photo
+        return winner.photoLarge || `/static/images/${winner.photo}`;
+    }
+
     async startDraw() {
         if (this.isDrawing) return;
         
@@ -234,7 +332,7 @@ class LotteryDraw {
             this.clearPreviousAnimation();
             
             // Get winner from backend
-            const response = await fetch('/draw', {
+            const response = await fetch(this.apiUrl('/draw'), {
                 method: 'GET',
                 headers: {
                     'Accept': 'application/json'
@@ -274,6 +372,66 @@ class LotteryDraw {
         }
     }
 
+    async startBatchDraw() {
+        if (this.isDrawing) return;
+        // Every winner is recorded at once, so ask first as for a reset
+        const tier = this.currentPrizeType.textContent;
+        if (!confirm(`Are you sure you want to draw every remaining ${tier} prize at once? All winners are recorded immediately.`)) {
+            return;
+        }
+        
+        try {
+            this.isDrawing = true;
+            this.isBatchDrawing = true;
+            this.drawBtn.disabled = true;
+            this.drawBatchBtn.disabled = true;
+            this.clearPreviousAnimation();
+            
+            // One request draws and records the rest of the current tier; a
+            // retried request carries the same key and gets the same winners
+            const response = await fetch(this.apiUrl('/draw/batch'), {
+                method: 'POST',
+                headers: {
+                    'Accept': 'application/json',
+                    'Idempotency-Key': this.newIdempotencyKey()
+                }
+            });
+            
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            
+            const data = await response.json();
+            
+            // Reveal the winners one at a time with a shorter animation
+            for (const winner of data.winners) {
+                this.updateDrawCount(winner.drawNumber - 1);
+                await this.animateSelection(winner, 1500);
+                this.markWinner(winner.id);
+                if (this.isFinalDraw(winner.drawNumber)) {
+                    // The event's last prize gets the grand finale, as in a single draw
+                    await this.showGrandFinaleCelebration(winner);
+                    continue;
+                }
+                this.shootConfetti();
+                this.playCelebrationSound();
+                await new Promise(resolve => setTimeout(resolve, 800));
+            }
+            
+            this.updatePrizeStatus(data.prizeStatus);
+            this.updateDrawCount(data.drawCount);
+            
+        } catch (error) {
+            console.error('Batch draw error:', error);
+            this.handleError(error);
+        } finally {
+            this.isDrawing = false;
+            this.isBatchDrawing = false;
+            this.drawBatchBtn.disabled = false;
+            this.resetUI();
+        }
+    }
+
     clearPreviousAnimation() {
         // Remove highlight from all cards
         this.participants.forEach(card => {
@@ -291,10 +449,9 @@ class LotteryDraw {
                            !card.classList.contains('final-selection'));
     }
 
-    async animateSelection(winner) {
+    async animateSelection(winner, duration = 5000) {
         return new Promise((resolve, reject) => {
             try {
-                const duration = 5000;
                 const startTime = performance.now();
                 const winnerIndex = Array.from(this.participants)
                     .findIndex(el => el.dataset.id === String(winner.id));
@@ -404,12 +561,22 @@ class LotteryDraw {
 
     updatePrizeStatus(prizeStatus) {
         this.currentPrizeType.textContent = prizeStatus.currentType;
-        this.smallPrizeCount.textContent = 
-            `${prizeStatus.remaining.small}/${prizeStatus.total.small}`;
-        this.mediumPrizeCount.textContent = 
-            `${prizeStatus.remaining.medium}/${prizeStatus.total.medium}`;
-        this.bigPrizeCount.textContent = 
-            `${prizeStatus.remaining.big}/${prizeStatus.total.big}`;
+        this.prizeCounts.forEach(count => {
+            const tier = count.dataset.prizeCount;
+            count.textContent = `${prizeStatus.remaining[tier]}/${prizeStatus.total[tier]}`;
+        });
+        this.updateTotalDraws(prizeStatus);
+    }
+
+    updateTotalDraws(prizeStatus) {
+        this.totalDraws = Object.values(prizeStatus.total).reduce((sum, total) => sum + total, 0);
+        if (this.drawTotal) {
+            this.drawTotal.textContent = `/${this.totalDraws}`;
+        }
+    }
+
+    isFinalDraw(drawNumber) {
+        return this.totalDraws !== null && drawNumber === this.totalDraws;
     }
 
     markWinner(winnerId) {
@@ -453,7 +620,7 @@ class LotteryDraw {
         }
         
         // Update modal content
-        document.getElementById('grandWinnerPhoto').src = `/static/images/${winner.photo}`;
+        document.getElementById('grandWinnerPhoto').src = this.largePhotoUrl(winner);
         document.getElementById('grandWinnerName').textContent = winner.name;
         
         // Start celebrations
@@ -577,7 +744,7 @@ class LotteryDraw {
 
     playTickSound() {
         if (!this.tickSound) {
-            this.tickSound = new Audio('/static/sounds/tick.mp3');
+            this.tickSound = new Audio(this.tickSoundUrl);
             this.tickSound.volume = 0.2;
         }
         this.tickSound.currentTime = 0;
@@ -586,7 +753,7 @@ class LotteryDraw {
 
     playCelebrationSound() {
         try {
-            const audio = new Audio('/static/sounds/celebration.mp3');
+            const audio = new Audio(this.celebrationSoundUrl);
             audio.volume = 0.3;
             audio.play();
         } catch (error) {
@@ -604,7 +771,7 @@ class LotteryDraw {
 
     async loadPreviousWinners() {
         try {
-            const response = await fetch('/winners');
+            const response = await fetch(this.apiUrl('/winners'));
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
@@ -633,7 +800,7 @@ class LotteryDraw {
 
     async resetDraw() {
         try {
-            const response = await fetch('/reset', {
+            const response = await fetch(this.apiUrl('/reset'), {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -651,12 +818,8 @@ class LotteryDraw {
             });
             
             // Reset prize counts
-            const prizeStatus = {
-                remaining: { small: 20, medium: 10, big: 5 },
-                total: { small: 20, medium: 10, big: 5 },
-                currentType: "SMALL"
-            };
-            this.updatePrizeCounts(prizeStatus);
+            const data = await response.json();
+            this.updatePrizeCounts(data.prizeStatus);
             
             // Enable draw button if disabled
             this.drawBtn.disabled = false;
@@ -680,20 +843,14 @@ class LotteryDraw {
 
     updatePrizeCounts(prizeStatus) {
         // Update prize count displays
-        this.smallPrizeCount.textContent = `${prizeStatus.remaining.small}/${prizeStatus.total.small}`;
-        this.mediumPrizeCount.textContent = `${prizeStatus.remaining.medium}/${prizeStatus.total.medium}`;
-        this.bigPrizeCount.textContent = `${prizeStatus.remaining.big}/${prizeStatus.total.big}`;
+        this.prizeCounts.forEach(count => {
+            const tier = count.dataset.prizeCount;
+            count.textContent = `${prizeStatus.remaining[tier]}/${prizeStatus.total[tier]}`;
+        });
         
         // Update current prize type
         this.currentPrizeType.textContent = prizeStatus.currentType;
-    }
-
-    // Add new method to update counter
-    updateDrawCounter(remainingDraws) {
-        if (this.drawCounter) {
-            const remaining = this.totalDraws - remainingDraws;
-            this.drawCounter.textContent = this.totalDraws - remaining;
-        }
+        this.updateTotalDraws(prizeStatus);
     }
 
     updateDrawCount(drawCount) {
@@ -710,9 +867,22 @@ class LotteryDraw {
         }
     }
 
+    async loadPrizeStatus() {
+        // The page is served from a cache, so prize counts are filled in here
+        try {
+            const response = await fetch(this.apiUrl('/prize-status'));
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            this.updatePrizeStatus(await response.json());
+        } catch (error) {
+            console.error('Error loading prize status:', error);
+        }
+    }
+
     async loadAbsentParticipants() {
         try {
-            const response = await fetch('/absent-participants');
+            const response = await fetch(this.apiUrl('/absent-participants'));
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
@@ -0,0 +1,223 @@
+"""Draw-path benchmark for the lottery app.
+
+Drives the FastAPI app in-process through httpx's ASGI transport against a
+temporary database seeded with a synthetic roster, and reports latency
+percentiles and throughput per endpoint, concurrency level and roster size
+as JSON.
+
+    python -m benchmarks.bench_draw --output bench.json
+    python -m benchmarks.bench_draw --roster-sizes 70 --concurrency 1 8 --requests 100
+
+Each roster size runs in its own subprocess so module-level state (pools,
+caches, the participant registry) never leaks between runs.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_ROSTER_SIZES = [70, 10_000, 100_000]
+DEFAULT_CONCURRENCY = [1, 8, 32]
+
+# Enough prizes that accepts never run out during a run
+BENCH_PRIZE_CAPACITY = 1_000_000
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "rps": round(count / elapsed, 1) if elapsed else None,
+        "mean_ms": round(1000 * sum(latencies) / count, 3) if count else None,
+        "p50_ms": round(1000 * percentile(latencies, 0.50), 3) if count else None,
+        "p95_ms": round(1000 * percentile(latencies, 0.95), 3) if count else None,
+        "p99_ms": round(1000 * percentile(latencies, 0.99), 3) if count else None,
+    }
+
+
+async def run_load(client, method, path_for, requests, concurrency):
+    """Issue `requests` calls with `concurrency` in flight and time each one."""
+    counter = itertools.count()
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if i >= requests:
+                return
+            started = time.perf_counter()
+            response = await client.request(method, path_for(i))
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def concurrency_levels(endpoint, levels):
+    """Concurrent /draw calls share the draw in flight, so it is only timed one at a time."""
+    return [1] if endpoint == "/draw" else levels
+
+
+def seed_database(roster_size):
+    """Create the schema, the configured events, a synthetic roster and ample prize capacity."""
+    from app import database, prizes
+
+    database.init_db()
+    prizes.seed_events()
+    database.import_participants(
+        [(i, f"Participant {i}", f"participant-{i}.jpg") for i in range(1, roster_size + 1)]
+    )
+    name, tiers = prizes.load_events()[database.DEFAULT_EVENT]
+    database.configure_event(database.DEFAULT_EVENT, name, [
+        (prize_type, BENCH_PRIZE_CAPACITY if prize_type == "SMALL" else total) for prize_type, total in tiers
+    ])
+    reset_for_accepts()
+    database.close_pool()
+
+
+def reset_for_accepts():
+    """Clear winners and refill prizes outside the timed section, through the journaled reset."""
+    from app import database
+
+    database.reset_all(database.DEFAULT_EVENT)
+
+
+async def bench_roster(args):
+    """Benchmark one roster size (runs inside a worker subprocess)."""
+    import httpx
+
+    seed_database(args.roster_size)
+
+    from app.main import app
+
+    await app.router.startup()
+    results = []
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # Warm caches and the registry once before timing anything
+            await client.get("/prize-status")
+            await client.get("/draw")
+
+            scenarios = [
+                ("GET", "/prize-status", lambda i: "/prize-status", args.requests),
+                ("GET", "/winners", lambda i: "/winners", args.requests),
+                ("GET", "/", lambda i: "/", args.page_requests),
+                ("GET", "/draw", lambda i: "/draw", args.requests),
+            ]
+            for method, name, path_for, requests in scenarios:
+                for concurrency in concurrency_levels(name, args.concurrency):
+                    summary = await run_load(client, method, path_for, requests, concurrency)
+                    results.append({"roster_size": args.roster_size, "endpoint": name,
+                                    "concurrency": concurrency, **summary})
+
+            # Each accept needs a distinct participant, so cap by roster size
+            accept_requests = min(args.requests, args.roster_size)
+            for concurrency in args.concurrency:
+                reset_for_accepts()
+                ids = iter(range(1, accept_requests + 1))
+                summary = await run_load(client, "POST", lambda i: f"/accept-winner/{next(ids)}",
+                                         accept_requests, concurrency)
+                results.append({"roster_size": args.roster_size, "endpoint": "/accept-winner",
+                                "concurrency": concurrency, **summary})
+    finally:
+        await app.router.shutdown()
+    return results
+
+
+def run_worker(args):
+    results = asyncio.run(bench_roster(args))
+    json.dump(results, sys.stdout)
+
+
+def run_suite(args):
+    """Run every roster size in a fresh subprocess and collect the results."""
+    results = []
+    for roster_size in args.roster_sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {
+                **os.environ,
+                "LOTTERY_DB_PATH": str(Path(tmp) / "bench.db"),
+                "DRAW_DELAY_MIN": str(args.suspense[0]),
+                "DRAW_DELAY_MAX": str(args.suspense[1]),
+            }
+            command = [
+                sys.executable, "-m", "benchmarks.bench_draw", "--worker",
+                "--roster-size", str(roster_size),
+                "--requests", str(args.requests),
+                "--page-requests", str(args.page_requests),
+                "--concurrency", *map(str, args.concurrency),
+            ]
+            print(f"Benchmarking roster of {roster_size}...", file=sys.stderr)
+            output = subprocess.run(command, cwd=ROOT_DIR, env=env, check=True,
+                                    stdout=subprocess.PIPE).stdout
+            results.extend(json.loads(output))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "page_requests": args.page_requests,
+            "concurrency": args.concurrency,
+            "draw_concurrency": concurrency_levels("/draw", args.concurrency),
+            "notes": ["/draw is timed at concurrency 1 only: concurrent calls for one event "
+                      "are coalesced onto the draw in flight, so higher levels would not measure draws"],
+            "roster_sizes": args.roster_sizes,
+            "draw_delay": args.suspense,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    else:
+        print(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--roster-sizes", type=int, nargs="+", default=DEFAULT_ROSTER_SIZES)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and concurrency level")
+    parser.add_argument("--page-requests", type=int, default=20, help="requests for the rendered index page")
+    parser.add_argument("--suspense", type=float, nargs=2, default=[0, 0], metavar=("MIN", "MAX"),
+                        help="draw suspense delay range in seconds (default: disabled)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--roster-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+    else:
+        run_suite(args)
+
+
+if __name__ == "__main__":
+    main()
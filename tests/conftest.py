@@ -0,0 +1,29 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import backup, database, idempotency, main
+from app.participants import registry
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Point the app at an empty database in a temporary directory."""
+    database.close_pool()
+    monkeypatch.setattr(database, "DB_PATH", tmp_path / "lottery.db")
+    monkeypatch.setattr(backup, "BACKUP_DIR", tmp_path / "backups")
+    monkeypatch.setattr(registry, "version", None)
+    yield tmp_path / "lottery.db"
+    database.close_pool()
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    """A test client over a freshly migrated and seeded database."""
+    monkeypatch.setattr(main, "DRAW_DELAY_MIN", 0)
+    monkeypatch.setattr(main, "DRAW_DELAY_MAX", 0)
+    main.eligible_pools.clear()
+    main.index_pages.clear()
+    idempotency.cache.clear()
+    with TestClient(main.app) as test_client:
+        yield test_client
+
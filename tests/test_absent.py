@@ -0,0 +1,42 @@
+import pytest
+
+from app import database
+
+
+@pytest.mark.parametrize("body", [
+    {"ids": "12"},
+    "12",
+    [1.9, 2],
+    [True],
+    {"ids": [1, False]},
+    [[1, 2]],
+    {"ids": [{"id": 1}]},
+    ["3"],
+    {"ids": None},
+    {"participants": [1]},
+    7,
+])
+def test_malformed_ids_are_rejected(client, body):
+    version = database.get_state_version()
+    response = client.post("/mark-absent", json=body)
+    assert response.status_code == 400
+    assert database.get_absent_participants() == set()
+    assert database.get_state_version() == version
+
+
+def test_invalid_json_is_rejected(client):
+    response = client.post("/mark-absent", data="[1,", headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+
+
+def test_list_and_object_bodies(client):
+    assert client.post("/mark-absent", json=[1, 2]).json()["inserted"] == [1, 2]
+    result = client.post("/mark-absent", json={"ids": [2, 3, 100000]}).json()
+    assert (result["inserted"], result["duplicate"], result["unknown"]) == ([3], [2], [100000])
+    assert set(database.get_absent_participants()) == {1, 2, 3}
+
+
+def test_empty_list_writes_nothing(client):
+    version = database.get_state_version()
+    assert client.post("/mark-absent", json=[]).json()["inserted"] == []
+    assert database.get_state_version() == version
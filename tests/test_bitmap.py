@@ -0,0 +1,55 @@
+import base64
+
+from app.bitmap import DenseIndex
+
+
+def decode(index, encoded):
+    """Ids set in a base64 bitmap, per the layout documented in bitmap.py."""
+    bits = base64.b64decode(encoded)
+    return {index.ids[position] for position in range(len(index))
+            if position // 8 < len(bits) and bits[position // 8] >> (position % 8) & 1}
+
+
+def test_base64_round_trip_contiguous():
+    index = DenseIndex(range(1, 68))
+    members = {1, 8, 9, 16, 34, 57, 67}
+    assert decode(index, index.set_of(members).to_base64()) == members
+
+
+def test_base64_round_trip_sparse_ids():
+    index = DenseIndex([1000, 5, 77, 12, 400000, 6])
+    members = {5, 77, 400000}
+    encoded = index.set_of(members).to_base64()
+    assert decode(index, encoded) == members
+    assert index.position(13) is None
+
+
+def test_base64_strips_trailing_zero_bytes():
+    index = DenseIndex(range(1, 101))
+    assert base64.b64decode(index.set_of({2}).to_base64()) == b"\x02"
+    assert index.set_of(()).to_base64() == ""
+
+
+def test_ranges():
+    index = DenseIndex(range(1, 21))
+    assert index.set_of({1, 2, 3, 7, 9, 10, 20}).ranges() == [[1, 3], [7, 7], [9, 10], [20, 20]]
+    assert index.set_of(()).ranges() == []
+
+
+def test_ranges_include_ids_outside_the_index():
+    index = DenseIndex([1, 2, 3])
+    participants = index.set_of({2, 3, 4, 9})
+    assert participants.extra == {4, 9}
+    assert participants.ranges() == [[2, 4], [9, 9]]
+
+
+def test_set_operations_match_python_sets():
+    index = DenseIndex([3, 1, 4, 15, 9, 26, 5, 35])
+    a, b = {1, 4, 9, 35, 99}, {4, 5, 26, 35}
+    left, right = index.set_of(a), index.set_of(b)
+    assert set(left | right) == a | b
+    assert set(left & right) == a & b
+    assert set(left - right) == a - b
+    assert set(index.everyone() - left) == set(index.ids) - a
+    assert len(left) == len(a)
+    assert 99 in left and 2 not in left
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+from fastapi import HTTPException
+
+from app import main, prizes
+from app.eligibility import EligiblePool
+
+
+def test_pick_batch_places_forced_draws():
+    pool = EligiblePool(range(1, 11), rng=random.Random(3))
+    for _ in range(20):
+        picked = main.pick_batch(pool, 4, 5, {5: 7, 20: 9})
+        assert len(set(picked)) == 5
+        assert picked[1] == 7
+        assert 9 not in picked
+
+
+def test_pick_batch_without_forced_draws_uses_the_whole_pool():
+    pool = EligiblePool([1, 2, 3])
+    assert sorted(main.pick_batch(pool, 1, 3, {})) == [1, 2, 3]
+
+
+def test_pick_batch_rejects_an_unavailable_forced_participant():
+    pool = EligiblePool([1, 2, 3])
+    with pytest.raises(HTTPException) as raised:
+        main.pick_batch(pool, 1, 2, {2: 50})
+    assert raised.value.status_code == 400
+
+
+def test_only_the_default_event_has_forced_draws():
+    assert prizes.forced_draws("spring") == {}
+
+
+def test_new_events_draw_from_everyone(client):
+    client.put("/events/small", json={"tiers": [{"type": "A", "total": 3}]})
+    forced_ids = set(prizes.forced_draws(main.DEFAULT_EVENT).values())
+    keep = sorted(forced_ids | {1, 2})[:3]
+    others = [p["id"] for p in main.registry.all() if p["id"] not in keep]
+    client.post("/mark-absent?event=small", json=others)
+    response = client.post("/draw/batch?event=small")
+    assert response.status_code == 200
+    assert sorted(winner["id"] for winner in response.json()["winners"]) == keep
+
+
+def test_new_events_are_not_stopped_by_an_absent_forced_participant(client):
+    client.put("/events/large", json={"tiers": [{"type": "A", "total": 40}]})
+    client.post("/mark-absent?event=large", json=list(set(prizes.forced_draws(main.DEFAULT_EVENT).values())))
+    response = client.post("/draw/batch?event=large")
+    assert response.status_code == 200
+    assert len(response.json()["winners"]) == 40
+
+
+def test_page_shows_the_event_prize_total(client):
+    assert 'id="drawTotal">/35<' in client.get("/").text
+    client.put("/events/small", json={"tiers": [{"type": "A", "total": 3}, {"type": "B", "total": 1}]})
+    assert 'id="drawTotal">/4<' in client.get("/?event=small").text
+    client.put("/events/small", json={"tiers": [{"type": "A", "total": 5}, {"type": "B", "total": 1}]})
+    assert 'id="drawTotal">/6<' in client.get("/?event=small").text
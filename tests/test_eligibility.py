@@ -0,0 +1,41 @@
+import random
+
+from app.eligibility import EligiblePool
+
+
+def test_remove_swaps_last_id_into_the_gap():
+    pool = EligiblePool(range(1, 11))
+    for participant_id in (1, 10, 5, 5, 42):
+        pool.remove(participant_id)
+    assert sorted(pool._ids) == [2, 3, 4, 6, 7, 8, 9]
+    assert {participant_id: pool._ids[index] for participant_id, index in pool._index.items()} == \
+        {participant_id: participant_id for participant_id in pool._ids}
+
+
+def test_remove_everything():
+    pool = EligiblePool([7, 8, 9])
+    for participant_id in (8, 9, 7):
+        pool.remove(participant_id)
+    assert len(pool) == 0
+    assert pool.choice() is None
+
+
+def test_choice_skips_excluded_ids():
+    pool = EligiblePool([1, 2, 3], rng=random.Random(1))
+    assert {pool.choice(exclude=(1, 3)) for _ in range(20)} == {2}
+    assert pool.choice(exclude=(1, 2, 3)) is None
+
+
+def test_sample_is_distinct_and_respects_exclusions():
+    pool = EligiblePool(range(1, 21), rng=random.Random(7))
+    picked = pool.sample(19, exclude=(20,))
+    assert sorted(picked) == list(range(1, 20))
+    assert pool.sample(20, exclude=(20,)) is None
+
+
+def test_apply_only_advances_by_one_version():
+    pool = EligiblePool([1, 2, 3], version=4, roster_version=1)
+    pool.apply([2], 5)
+    assert 2 not in pool and pool.is_current(5, 1)
+    pool.apply([3], 7)
+    assert pool.version is None and 3 in pool
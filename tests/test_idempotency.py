@@ -0,0 +1,81 @@
+from app import database, idempotency
+
+REPLAYED = idempotency.REPLAYED_HEADER.lower()
+
+
+def test_retry_on_another_worker_replays_accept(client):
+    headers = {"Idempotency-Key": "accept-1"}
+    first = client.post("/accept-winner/3", headers=headers)
+    version = database.get_state_version()
+    # A retry that reaches another worker misses that worker's in-memory cache
+    idempotency.cache.clear()
+    retry = client.post("/accept-winner/3", headers=headers)
+    assert retry.status_code == 200
+    assert retry.headers.get(REPLAYED) == "true"
+    assert retry.json() == first.json()
+    assert database.get_state_version() == version
+
+
+def test_repeat_accept_without_key_returns_recorded_result(client):
+    first = client.post("/accept-winner/5")
+    repeat = client.post("/accept-winner/5")
+    assert repeat.status_code == 200
+    assert repeat.headers.get(REPLAYED) == "true"
+    assert repeat.json() == first.json()
+    assert database.get_draw_count() == 1
+
+
+def test_same_key_on_another_participant_is_a_different_request(client):
+    client.post("/accept-winner/3", headers={"Idempotency-Key": "k"})
+    other = client.post("/mark-absent/4", headers={"Idempotency-Key": "k"})
+    assert other.status_code == 200
+    assert REPLAYED not in other.headers
+    assert 4 in database.get_absent_participants()
+
+
+def test_mark_absent_replays(client):
+    headers = {"Idempotency-Key": "absent-1"}
+    first = client.post("/mark-absent", json=[8, 9], headers=headers)
+    idempotency.cache.clear()
+    retry = client.post("/mark-absent", json=[8, 9], headers=headers)
+    assert retry.headers.get(REPLAYED) == "true"
+    assert retry.json() == first.json()
+
+    repeat = client.post("/mark-absent/8")
+    assert repeat.status_code == 200
+    assert repeat.headers.get(REPLAYED) == "true"
+
+
+def test_invalid_key(client):
+    assert client.post("/accept-winner/3", headers={"Idempotency-Key": "x" * 256}).status_code == 400
+
+
+def test_batch_draw_retry_returns_the_original_winners(client):
+    headers = {"Idempotency-Key": "batch-1"}
+    first = client.post("/draw/batch", headers=headers)
+    assert first.status_code == 200
+    assert len(first.json()["winners"]) == 20
+    version = database.get_state_version()
+
+    idempotency.cache.clear()
+    retry = client.post("/draw/batch", headers=headers)
+    assert retry.status_code == 200
+    assert retry.headers.get(REPLAYED) == "true"
+    assert retry.json() == first.json()
+    assert database.get_state_version() == version
+    # The next tier was not awarded
+    assert client.get("/prize-status").json()["remaining"]["medium"] == 10
+
+
+def test_batch_draw_retry_after_the_last_tier_ran_out(client):
+    for _ in range(2):
+        client.post("/draw/batch")
+    headers = {"Idempotency-Key": "last"}
+    first = client.post("/draw/batch", headers=headers)
+    assert client.get("/prize-status").json()["currentType"] is None
+
+    idempotency.cache.clear()
+    retry = client.post("/draw/batch", headers=headers)
+    assert retry.status_code == 200
+    assert retry.json()["winners"] == first.json()["winners"]
+    assert client.post("/draw/batch").status_code == 400
@@ -0,0 +1,98 @@
+from app import database, journal
+
+
+def live_state():
+    with database.get_db() as db:
+        return database._read_state(db.cursor())
+
+
+def assert_journal_matches_tables():
+    """Both a full replay and the snapshot-based rebuild reproduce the state tables."""
+    version, states = journal.replay({"events": {}}, 0, database.get_journal(limit=100000))
+    assert version == database.get_state_version()
+    assert journal.dump_state(states) == live_state()
+    rebuilt = database.rebuild_state()
+    assert rebuilt is not None
+    assert rebuilt[0] == version
+    assert journal.dump_state(rebuilt[1]) == live_state()
+
+
+def test_replay_after_draws_accepts_and_absences(client):
+    client.post("/mark-absent/4")
+    for _ in range(3):
+        winner = client.get("/draw").json()["winner"]
+        assert client.post(f"/accept-winner/{winner['id']}").status_code == 200
+    client.post("/mark-absent", json=[10, 11])
+    assert_journal_matches_tables()
+
+
+def test_replay_after_batch_draw(client):
+    response = client.post("/draw/batch?count=5")
+    assert response.status_code == 200
+    assert len(response.json()["winners"]) == 5
+    client.post("/draw/batch")
+    assert client.get("/prize-status").json()["currentType"] == "MEDIUM"
+    assert_journal_matches_tables()
+
+
+def test_replay_after_reset(client):
+    client.post("/draw/batch?count=4")
+    client.post("/mark-absent/9")
+    assert client.post("/reset").status_code == 200
+    assert live_state()["events"]["default"]["winners"] == []
+    client.post("/draw/batch?count=2")
+    assert_journal_matches_tables()
+
+
+def test_replay_after_configure(client):
+    response = client.put("/events/spring", json={"name": "Spring", "tiers": [{"type": "A", "total": 2}]})
+    assert response.status_code == 200
+    client.post("/draw/batch?event=spring&count=1")
+    assert_journal_matches_tables()
+
+
+def test_replay_after_restore(client):
+    client.post("/draw/batch?count=3")
+    name = client.post("/backups").json()["name"]
+    client.post("/draw/batch?count=4")
+    before = database.get_journal(limit=100000)
+
+    response = client.post(f"/backups/{name}/restore")
+    assert response.status_code == 200
+    after = database.get_journal(limit=100000)
+    # The events since the backup are kept, and sequence numbers are not reused
+    assert [event["seq"] for event in after[:len(before)]] == [event["seq"] for event in before]
+    assert after[-1]["type"] == "restore"
+    assert after[-1]["seq"] > before[-1]["seq"]
+    assert len(live_state()["events"]["default"]["winners"]) == 3
+
+    client.post("/draw/batch?count=1")
+    assert_journal_matches_tables()
+
+
+def test_replay_detects_unjournaled_writes(client):
+    client.post("/draw/batch?count=2")
+    database.compact_journal(force=True)
+    with database.get_db() as db:
+        db.execute("UPDATE state_version SET version = version + 1 WHERE id = 1")
+        db.commit()
+    assert database.rebuild_state() is None
+    assert database.compact_journal() is not None
+    assert database.rebuild_state() is not None
+
+
+def test_failed_restore_changes_nothing(client, monkeypatch):
+    client.post("/draw/batch?count=2")
+    name = client.post("/backups").json()["name"]
+    client.post("/draw/batch?count=3")
+    state, journal_before = live_state(), database.get_journal(limit=100000)
+
+    def fail(*args, **kwargs):
+        raise database.sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(database, "_append_event", fail)
+    response = client.post(f"/backups/{name}/restore")
+    assert response.status_code == 500
+    # The table copies were rolled back with the failed journal append
+    assert live_state() == state
+    assert database.get_journal(limit=100000) == journal_before
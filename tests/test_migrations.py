@@ -0,0 +1,98 @@
+import shutil
+import sqlite3
+from pathlib import Path
+
+from app import database, journal, prizes
+
+BASELINE_DB = Path(database.BASE_DIR) / "lottery.db"
+
+
+def user_version(path):
+    with sqlite3.connect(path) as db:
+        return db.execute("PRAGMA user_version").fetchone()[0]
+
+
+def full_replay():
+    """Replay the whole journal from an empty state."""
+    return journal.replay({"events": {}}, 0, database.get_journal(limit=100000))
+
+
+def live_state():
+    with database.get_db() as db:
+        return database._read_state(db.cursor())
+
+
+def test_baseline_database_migrates(db):
+    shutil.copy(BASELINE_DB, db)
+    assert user_version(db) == 0
+    with sqlite3.connect(db) as old:
+        old.execute("UPDATE prize_status SET remaining = remaining - 2 WHERE type = 'SMALL'")
+        old.execute("UPDATE draws SET count = 3 WHERE id = 1")
+        old.executemany("INSERT INTO winners (participant_id, prize_type) VALUES (?, 'SMALL')", [(5,), (9,)])
+        old.execute("INSERT INTO absent_participants (participant_id) VALUES (12)")
+
+    assert database.init_db() == database.SCHEMA_VERSION
+    assert user_version(db) == database.SCHEMA_VERSION
+    assert database.init_db() == 0
+
+    assert database.get_prize_status()["remaining"] == {"small": 18, "medium": 10, "big": 5}
+    assert database.get_draw_count() == 3
+    assert set(database.get_winners()) == {5, 9}
+    assert set(database.get_absent_participants()) == {12}
+    assert [row["participantId"] for row in database.get_winner_history()] == [5, 9]
+
+    version, states = full_replay()
+    assert version == database.get_state_version()
+    assert journal.dump_state(states) == live_state()
+
+
+def test_seeding_a_migrated_baseline_keeps_existing_tiers(db):
+    shutil.copy(BASELINE_DB, db)
+    database.init_db()
+    assert prizes.seed_events() == []
+    assert [tier["type"] for tier in database.get_events()[database.DEFAULT_EVENT]["tiers"]] == \
+        ["SMALL", "MEDIUM", "BIG"]
+
+
+def test_partially_migrated_database(db):
+    """A schema 5 database with winners and a journal picks up the later migrations."""
+    with sqlite3.connect(db) as old:
+        cursor = old.cursor()
+        for migration in database.MIGRATIONS[:5]:
+            migration(cursor)
+        cursor.execute("PRAGMA user_version = 5")
+        cursor.execute("INSERT INTO events (id, name) VALUES ('default', 'Lottery Draw')")
+        cursor.execute("INSERT INTO prize_status (event_id, type, rank, total, remaining) "
+                       "VALUES ('default', 'SMALL', 0, 3, 1)")
+        cursor.execute("INSERT INTO draws (event_id, count) VALUES ('default', 2)")
+        cursor.executemany(
+            "INSERT INTO winners (event_id, participant_id, prize_type, draw_time) VALUES ('default', ?, 'SMALL', ?)",
+            [(8, "2024-01-01 10:00:01"), (3, "2024-01-01 10:00:00")]
+        )
+        cursor.execute("INSERT INTO draw_events (type, version, event_id) VALUES ('draw', 0, 'default')")
+        old.commit()
+
+    assert database.init_db() == database.SCHEMA_VERSION - 5
+    with database.get_db() as conn:
+        seqs = conn.execute("SELECT participant_id, journal_seq FROM winners ORDER BY journal_seq").fetchall()
+    # Existing winners sort before anything new, in their old draw_time order
+    assert [participant_id for participant_id, _ in seqs] == [3, 8]
+    assert all(seq <= 0 for _, seq in seqs)
+
+    assert database.accept_winner(20)["prizeType"] == "SMALL"
+    assert [row["participantId"] for row in database.get_winner_history()] == [3, 8, 20]
+    version, states = full_replay()
+    assert version == database.get_state_version()
+    assert journal.dump_state(states) == live_state()
+
+
+def test_journal_rejects_updates_and_deletes(db):
+    database.init_db()
+    with database.get_db() as conn:
+        for statement in ("UPDATE draw_events SET version = 0", "DELETE FROM draw_events"):
+            try:
+                conn.execute(statement)
+            except sqlite3.DatabaseError as e:
+                assert "append-only" in str(e)
+            else:
+                raise AssertionError(f"{statement} was allowed")